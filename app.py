@@ -1,9 +1,21 @@
 # Importing required libraries
 import streamlit as st  # For building the web app interface
-from pdf_processor import extract_text_from_pdf  # Custom function to extract text from PDF files
-from summarizer import initialize_summarizer, generate_summary  # Summarizer setup and execution
-from topic_modeler import initialize_topic_model, extract_topics  # Topic model setup and topic extraction
-import time  # For measuring processing time
+from pdf_processor import PDF_WORKERS, extract_text_from_pdf  # Custom function to extract text from PDF files
+from summarizer import iter_summary  # Streamed summarization
+from topic_modeler import extract_topics  # Topic extraction
+from result_cache import ResultCache, make_key, normalize_text  # Cache for summaries and topics of documents seen before
+from embedding_store import EmbeddingStore  # Persistent sentence embeddings for the topic model
+from pipeline_executor import PipelineExecutor, default_thread_budgets  # Runs both stages at the same time
+from model_registry import warm_up  # Loads the models in the background
+from model_profiles import (PROFILES, DEFAULT_LATENCY_TARGET, choose_profile, estimate_seconds,  # Quality/balanced/fast models
+                            acquire, evict_idle, load_profile, loaded_models, loaded_profiles, release)
+from preprocess import preprocess  # Normalizes and splits the text once for both stages
+from extractive import embed_sentences, extractive_summary  # Picks the most central sentences without generating
+from corpus_store import CorpusStore  # Searchable archive of every processed document
+from tracing import profile, trace, traced  # Per-stage timing spans and profiling
+import os  # For the number of CPU cores
+import time  # For timing archive searches
+from contextlib import nullcontext  # No-op stand-in when profiling is off
 from collections import defaultdict  # (Not used here, but useful for mapping structures)
 
 # Streamlit page configuration
@@ -13,12 +25,166 @@ st.set_page_config(
     initial_sidebar_state="expanded",  # Sidebar starts expanded
 )
 
-# Load and cache the models to avoid reloading them every time the app runs
+# Optional topic model fitted once on a reference corpus (see fit_topic_model.py)
+TOPIC_MODEL_PATH = os.environ.get("TOPIC_MODEL_PATH")
+
+# Model profile: "auto" picks one per request from the document length and the latency target
+MODEL_PROFILE = os.environ.get("MODEL_PROFILE", "auto")
+
+# Start loading (and timing) a profile in the background once per server process,
+# so the page renders straight away instead of waiting for it
+@st.cache_resource
+def start_warm_up():
+    first = "quality" if MODEL_PROFILE == "auto" else MODEL_PROFILE
+    return warm_up(lambda: load_models(first, default_thread_budgets()["summary"]))
+
+# Get a profile's models (loaded only once per process; waits if still warming up)
+def load_models(profile_name, summary_threads=None):
+    return load_profile(profile_name, TOPIC_MODEL_PATH, summary_threads)  # Service, chunker, topic model and its mode
+
+# One result cache per server process, backed by a SQLite file so it survives restarts
+@st.cache_resource
+def load_cache():
+    return ResultCache(disk_path=".cache/results.sqlite")
+
+# Sentence embeddings are stored on disk so repeated sentences are never re-encoded
+@st.cache_resource
+def load_embedding_store():
+    return EmbeddingStore(".cache/embeddings")
+
+# One archive per embedding model, so stored vectors and queries always match
 @st.cache_resource
-def load_models():
-    summarizer = initialize_summarizer()  # Load the summarization model
-    topic_model = initialize_topic_model()  # Load the topic modeling pipeline
-    return summarizer, topic_model  # Return both models as a tuple
+def load_corpus(model_name):
+    return CorpusStore(".cache/corpus", model_name)
+
+# One worker per stage, each limited to its own share of the CPU cores
+@st.cache_resource
+def load_executor(summary_threads, topic_threads):
+    return PipelineExecutor({"summary": summary_threads, "topics": topic_threads})
+
+# Show the summary section
+def render_summary(summary):
+    st.header("📃 Summary Result")
+    with st.expander("🔎 View Summary", expanded=True):
+        st.info(summary)  # Display the summary in an info box
+    st.download_button("📥 Download Summary", summary, file_name="summary.txt")  # Download button for summary
+
+# Show the topic extraction section
+def render_topics(topic_info):
+    st.header("🗂 Topic Extraction")
+
+    st.subheader("Main Themes")
+    st.write(topic_info['summary'])  # Display general topic summary
+    if "error" in topic_info:
+        st.error(f"Topic extraction failed: {topic_info['error']}")  # Show what went wrong
+
+    if topic_info['topics']:  # If topic labels were extracted
+        st.subheader("Topic Labels")
+        for i, (label, desc) in enumerate(zip(topic_info['topics'], topic_info['descriptions']), 1):
+            # Show each topic label and a representative segment
+            st.markdown(f"""
+            **Topic {i}:** {label}  
+            *Representative segment:*  
+            `{desc}`
+            """)
+            st.markdown("---")  # Separator for each topic
+    else:
+        st.warning("No meaningful topics could be extracted from the text.")  # Fallback warning
+
+# Show where the time went: nested spans, downloads and the optional profile
+def render_trace(t):
+    with st.expander("⏱ Timing breakdown"):
+        st.dataframe(t.rows(), use_container_width=True)  # One row per span, indented by nesting
+        col1, col2 = st.columns(2)
+        col1.download_button("📥 Trace (JSON)", t.to_json(), file_name="trace.json")
+        col2.download_button("📥 Chrome trace", t.to_chrome_trace(), file_name="trace.chrome.json")
+        if t.profile:
+            st.code(t.profile)  # cProfile stats or collapsed sampling stacks
+
+# Show the summary while chunks are still being summarized
+def render_summary_progress(update):
+    st.header("📃 Summary Result")
+    st.progress(update["progress"], text=f"{update['chunks_done']} of {update['chunks']} chunks summarized")
+    if update["summary"]:
+        st.info(update["summary"])  # Everything summarized so far
+
+# Show a running (or finished) job, refreshing it until both stages are done
+def render_job(state):
+    job = state["job"]
+    status = st.empty()  # Placeholder for the progress / final timing message
+    dropped = sum(state["dropped"].values())
+    if dropped:
+        # Characters that never reached the models
+        st.caption(f"🧹 Skipped {dropped:,} characters of repeated headers/footers and duplicate sentences")
+    st.markdown("---")  # Separator
+    summary_area = st.empty()  # Summary output appears here
+    st.markdown("---")
+    topics_area = st.empty()  # Topic extraction output appears here
+
+    rendered = set()  # Stages whose final result is already on the page
+    while True:
+        done = job.done
+        for stage, (result, finished, error) in job.snapshot().items():
+            if stage in rendered:
+                continue
+            area = summary_area if stage == "summary" else topics_area
+            with area.container():
+                if error is not None:
+                    st.error(f"{stage.capitalize()} failed: {error}")  # Show what went wrong
+                elif finished and stage == "summary":
+                    # Streamed summaries end with a progress update holding the full text
+                    render_summary(result["summary"] if isinstance(result, dict) else result)
+                elif finished:
+                    render_topics(result)
+                elif stage == "summary" and result is not None:
+                    render_summary_progress(result)  # Partial summary
+                else:
+                    st.caption(f"⏳ {stage.capitalize()} in progress...")
+            if finished:
+                rendered.add(stage)
+        if done:
+            break
+        status.info(f"⏳ Working on it with the {state['profile']} models... {job.seconds:.0f}s "
+                    f"(estimated {state['estimate']:.0f}s)")
+        job.wait(0.5)  # Wake up as soon as a stage reports something new
+
+    # Show success message, how long it took and which models did the work
+    status.success(f"✅ Done! Processed in {job.seconds:.2f} seconds with the {state['profile']} models "
+                   f"(estimated {state['estimate']:.0f}s).")
+
+    # How busy the shared summarization queue of this profile is
+    service = state["service"].metrics()
+    st.caption(f"Inference queue: {service['queue_depth']} waiting, "
+               f"mean batch {service['mean_batch_size']:.1f} chunks over {service['batches']} batches")
+
+# Search and browse every document processed so far
+def render_archive(corpus, topic_model):
+    st.header("🗄 Document Archive")
+    stats = corpus.stats()
+    st.caption(f"{stats['documents']} documents, {stats['passages']:,} passages ({stats['index']} index)")
+    if not stats["documents"]:
+        st.info("Processed documents show up here.")
+        return
+
+    search_tab, topics_tab = st.tabs(["🔍 Find similar passages", "🗂 Browse topics"])
+    with search_tab:
+        query = st.text_input("Describe what you are looking for")
+        if query:
+            start = time.perf_counter()
+            hits = corpus.search(embed_sentences([query], topic_model)[0], k=10)
+            st.caption(f"{len(hits)} passages in {(time.perf_counter() - start) * 1000:.0f} ms")
+            for hit in hits:
+                st.markdown(f"**{hit['title']}** · similarity {hit['score']:.2f}  \n{hit['text']}")
+
+    with topics_tab:
+        keyword = st.text_input("Filter topics by keyword")
+        for i, topic in enumerate(corpus.topics(keyword, limit=50)):  # Biggest topics first
+            with st.expander(f"{topic['label']} — {topic['title']} ({topic['size']} passages)"):
+                st.markdown(f"`{topic['representative']}`")
+                # The same theme in the other documents
+                if topic["row"] is not None and st.button("Similar passages in other documents", key=f"similar_{i}"):
+                    for hit in corpus.similar_passages(topic["row"], k=5):
+                        st.markdown(f"**{hit['title']}** · similarity {hit['score']:.2f}  \n{hit['text']}")
 
 # Main function that runs the Streamlit app
 def main():
@@ -30,70 +196,125 @@ def main():
         # Input method radio buttons for choosing PDF upload or text input
         input_method = st.radio("Choose input method:", ("📄 Upload PDF", "✍️ Paste Text"))
 
+        # How much of the document goes through the summarization model
+        summary_mode = st.radio("Summary mode:", ("🧠 Full", "⚡ Key sentences + AI", "👀 Key sentences only"))
+        keep_ratio = st.slider("Key sentences kept", 0.05, 1.0, 0.2, 0.05,
+                               disabled=summary_mode == "🧠 Full")  # Fraction of sentences kept
+
         st.markdown("---")  # Another separator
         st.info("Need help? Scroll to the bottom ➡️ 📚 About Section")  # Info message in sidebar
 
+        cache = load_cache()  # Shared result cache
+        stats = cache.stats()
+        st.caption(f"Cache: {stats['hits']} hits / {stats['misses']} misses")  # Cache hit/miss counters
+
+        # CPU threads given to each stage so the two don't fight over cores
+        budgets = default_thread_budgets()
+        with st.expander("⚡ Performance"):
+            summary_threads = st.number_input("Summary threads", 1, 64, budgets["summary"])
+            topic_threads = st.number_input("Topic threads", 1, 64, budgets["topics"])
+            profile_mode = st.selectbox("Profile next request", ("off", "cprofile", "sampling"))  # Optional profiler
+
+            # Bigger models for short documents, faster ones when the target would be missed
+            profile_names = ("auto",) + tuple(PROFILES)
+            model_profile = st.selectbox("Model profile", profile_names, profile_names.index(MODEL_PROFILE))
+            latency_target = st.number_input("Latency target (seconds)", 5.0, 3600.0, DEFAULT_LATENCY_TARGET)
+
     # Main page title and caption
     st.title("Smart Text Summarization & Topic Extraction")
     st.caption("An AI tool to quickly **summarize** and **understand** your documents.")
 
-    summarizer, topic_model = load_models()  # Load cached models
+    start_warm_up()  # Models keep loading while the user picks a document
     text = ""  # Initialize an empty text variable
+    pdf_trace = None  # Timing spans of the PDF extraction, if any
 
     # Input section: either upload a PDF or paste text manually
     if input_method == "📄 Upload PDF":
         uploaded_file = st.file_uploader("Upload your PDF here", type="pdf")  # File uploader UI
         if uploaded_file:
             with st.spinner("Extracting text from PDF..."):  # Show spinner while processing
-                text = extract_text_from_pdf(uploaded_file)  # Extract text from the uploaded PDF
+                # Extract text from the uploaded PDF, parsing pages in a small shared pool and reusing cached pages
+                text, pdf_trace = traced(extract_text_from_pdf, uploaded_file,
+                                         workers=PDF_WORKERS, cache=cache)
     else:
         # Text area for pasting input directly
         text = st.text_area("Paste your text below 👇", height=300,
                             placeholder="Paste large articles, research papers, notes...")
 
-    # When user clicks the button to process the input
-    if text and st.button("✨ Process Text"):
-        with st.spinner("AI is working on it... 🛠️"):  # Show spinner while processing
-            start_time = time.time()  # Start timer
-
-            summary = generate_summary(text, summarizer)  # Generate summary (max_length is handled inside the function)
-            topic_info = extract_topics(text, topic_model)  # Extract topics and theme descriptions
+    # The same input and settings always map to the same job
+    job_key = make_key(normalize_text(text), summary_mode, keep_ratio, model_profile, latency_target) if text else None
+    current = st.session_state.get("job")  # The job started by an earlier run, if any
+    if current is not None and current["key"] != job_key:
+        current = None  # It was for another document or other settings
 
-            processing_time = time.time() - start_time  # Calculate how long the processing took
+    # When user clicks the button to process the input (clicking again while it runs does not restart it)
+    if text and st.button("✨ Process Text") and current is None:
+        # Normalize and split the text into sentences once, dropping repeated headers, footers
+        # and duplicate sentences; both stages read the result
+        doc = preprocess(text, dedup=True)
 
-        # Show success message and how long it took
-        st.success(f"✅ Done! Processed in {processing_time:.2f} seconds.")
-        st.markdown("---")  # Separator
+        # Pick the best profile that should finish within the latency target
+        words = doc.words * (keep_ratio if summary_mode == "⚡ Key sentences + AI" else 1)
+        profile_name = choose_profile(words, latency_target) if model_profile == "auto" else model_profile
+        acquire(profile_name)  # Keep this profile loaded until the job is done (and out of the eviction below)
+        evict_idle()  # Free the other profiles that have had no jobs for a while
 
-        # Summary output
-        st.header("📃 Summary Result")
-        with st.expander("🔎 View Summary", expanded=True):
-            st.info(summary)  # Display the summary in an info box
-        st.download_button("📥 Download Summary", summary, file_name="summary.txt")  # Download button for summary
+        try:
+            with st.spinner(f"Loading the {profile_name} models..."):  # Only waits the first time a profile is used
+                models = load_models(profile_name, summary_threads)  # Generation keeps to the summary budget
+        except Exception:
+            release(profile_name)
+            raise
+        topic_model = models["topic_model"]
+        corpus = load_corpus(models["embedding_model"])  # Keeps the document for later searches
 
-        # Topic extraction output
-        st.markdown("---")
-        st.header("🗂 Topic Extraction")
-
-        st.subheader("Main Themes")
-        st.write(topic_info['summary'])  # Display general topic summary
-
-        if topic_info['topics']:  # If topic labels were extracted
-            st.subheader("Topic Labels")
-            for i, (label, desc) in enumerate(zip(topic_info['topics'], topic_info['descriptions']), 1):
-                # Show each topic label and a representative segment
-                st.markdown(f"""
-                **Topic {i}:** {label}  
-                *Representative segment:*  
-                `{desc}`
-                """)
-                st.markdown("---")  # Separator for each topic
+        # Both stages are independent, so run them at the same time
+        embedding_store = load_embedding_store()
+        if summary_mode == "👀 Key sentences only":
+            # Instant preview: no generation at all
+            summary_task = (extractive_summary, (doc, topic_model), {"ratio": keep_ratio, "embedding_store": embedding_store})
         else:
-            st.warning("No meaningful topics could be extracted from the text.")  # Fallback warning
+            # Stream chunk summaries as they finish, optionally keeping only the most central sentences
+            ratio = keep_ratio if summary_mode == "⚡ Key sentences + AI" else None
+            summary_task = (iter_summary, (doc, models["service"]),
+                            {"cache": cache, "chunker": models["chunker"], "extractive_ratio": ratio,
+                             "sentence_model": topic_model, "embedding_store": embedding_store})
+        tasks = {
+            "summary": summary_task,
+            "topics": (extract_topics, (doc, topic_model),
+                       {"cache": cache, "embedding_store": embedding_store, "mode": models["topic_mode"],
+                        "corpus": corpus, "title": uploaded_file.name if input_method == "📄 Upload PDF" else None}),
+        }
+
+        # Run the job in the background and keep it in the session, so reruns show it instead of restarting it
+        with trace() as request_trace:  # Record spans (workers keep adding to it after this block)
+            if pdf_trace is not None:
+                request_trace.merge(pdf_trace)
+            profiler = profile(profile_mode) if profile_mode != "off" else nullcontext()
+            with profiler:
+                job = load_executor(summary_threads, topic_threads).start(tasks)
+                job.add_done_callback(lambda _: release(profile_name))  # The profile may be evicted once idle
+                current = st.session_state["job"] = {"key": job_key, "job": job, "trace": request_trace,
+                                                     "dropped": doc.dropped, "service": models["service"],
+                                                     "profile": profile_name,
+                                                     "estimate": estimate_seconds(profile_name, words)}
+                render_job(current)  # The profile covers the whole job
 
+        # Per-stage timings, including the PDF extraction when there was one
+        render_trace(request_trace)
+    elif current is not None:
+        render_job(current)  # Pick the job up again after a rerun
+        render_trace(current["trace"])
     elif not text:
         st.warning("🚨 Please upload a PDF or paste some text to begin.")  # Warning if no text was provided
 
+    # Archive of everything processed with the current (or an already loaded) profile's embedding model
+    archive_profile = current["profile"] if current else next(iter(loaded_profiles()), None)
+    archive_models = loaded_models(archive_profile) if archive_profile else None
+    if archive_models is not None:  # Never load (or wait for) models just to show the archive
+        st.markdown("---")
+        render_archive(load_corpus(archive_models["embedding_model"]), archive_models["topic_model"])
+
     # About section at the bottom of the page
     st.markdown("---")
     with st.expander("📚 About This App"):
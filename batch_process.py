@@ -0,0 +1,173 @@
+# Headless batch processing: summarize and extract topics for many documents at once
+#
+# Example:
+#   python batch_process.py reports/ "notes/*.txt" -o results.jsonl --workers 4
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pipeline_executor import set_thread_budget
+from preprocess import preprocess
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+
+# Models loaded once per worker process
+_models = {}
+
+
+def find_documents(inputs):
+    """Expand directories and glob patterns into a sorted list of PDF/.txt files."""
+    paths = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            for root, _, files in os.walk(pattern):
+                paths.update(os.path.join(root, f) for f in files)
+        else:
+            paths.update(glob.glob(pattern, recursive=True))
+    return sorted(p for p in paths if p.lower().endswith(SUPPORTED_EXTENSIONS) and os.path.isfile(p))
+
+
+def load_done(output_path):
+    """Paths already written successfully to the output file (used for resume)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partly written last line from an interrupted run
+            if "error" not in record:
+                done.add(record["path"])
+    return done
+
+
+def init_worker(light, with_topics, threads, backend=None, topic_model_path=None):
+    """Load the models once in this worker."""
+    if threads:
+        set_thread_budget(threads)
+    if light:
+        import summarizer_01 as summarizer_module
+        import topic_modeler_01 as topic_module
+    else:
+        import summarizer as summarizer_module
+        import topic_modeler as topic_module
+    _models["summarizer_module"] = summarizer_module
+    _models["summarizer"] = summarizer_module.initialize_summarizer(backend)
+    if with_topics:
+        _models["topic_module"] = topic_module
+        if topic_model_path:
+            # Reference model fitted once with fit_topic_model.py: transform only
+            from topic_modeler import load_reference_model
+            _models["topic_model"], _models["topic_mode"] = load_reference_model(topic_model_path)
+        else:
+            _models["topic_model"], _models["topic_mode"] = topic_module.initialize_topic_model(), "fit"
+
+
+def read_document(path):
+    if path.lower().endswith(".pdf"):
+        from pdf_processor import extract_text_from_pdf
+        return extract_text_from_pdf(path)
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def process_document(path):
+    """Summarize (and extract topics for) one file, returning a JSON-ready record."""
+    start_time = time.time()
+    try:
+        # Normalized, split and stripped of boilerplate/duplicates once for both stages
+        doc = preprocess(read_document(path), dedup=True)
+        record = {
+            "path": path,
+            "chars": len(doc.text),
+            "dropped_chars": doc.dropped,
+            "summary": _models["summarizer_module"].generate_summary(doc, _models["summarizer"]),
+        }
+        if "topic_model" in _models:
+            record["topics"] = _models["topic_module"].extract_topics(doc, _models["topic_model"],
+                                                                       mode=_models["topic_mode"])
+    except Exception as e:
+        record = {"path": path, "error": f"{type(e).__name__}: {e}"}
+    record["seconds"] = round(time.time() - start_time, 3)
+    return record
+
+
+def run(paths, output_path, workers=1, light=False, with_topics=True, threads=None, backend=None,
+        topic_model_path=None):
+    """Process `paths` and append one JSON line per document to `output_path`."""
+    stats = {"processed": 0, "failed": 0, "chars": 0}
+    start_time = time.time()
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        def write(record):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if "error" in record:
+                stats["failed"] += 1
+            else:
+                stats["processed"] += 1
+                stats["chars"] += record["chars"]
+            done = stats["processed"] + stats["failed"]
+            print(f"[{done}/{len(paths)}] {record['path']} ({record['seconds']:.1f}s)"
+                  + (f" FAILED: {record['error']}" if "error" in record else ""), file=sys.stderr)
+
+        if workers <= 1:
+            init_worker(light, with_topics, threads, backend, topic_model_path)
+            for path in paths:
+                write(process_document(path))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                     initargs=(light, with_topics, threads, backend, topic_model_path)) as pool:
+                futures = [pool.submit(process_document, path) for path in paths]
+                for future in as_completed(futures):
+                    write(future.result())
+
+    stats["seconds"] = time.time() - start_time
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize and extract topics from a batch of PDF and .txt files.")
+    parser.add_argument("inputs", nargs="+", help="Files, directories or glob patterns")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file to append results to")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Worker processes (each loads its own models)")
+    parser.add_argument("--threads", type=int, default=None, help="torch/numba threads per worker")
+    parser.add_argument("--light", action="store_true", help="Use the fast Falconsai T5 / ALBERT models")
+    parser.add_argument("--backend", choices=["pytorch", "int8", "onnx"], default=None,
+                        help="Summarizer inference backend (default: $SUMMARIZER_BACKEND or pytorch)")
+    parser.add_argument("--topic-model", help="Reference topic model from fit_topic_model.py (transform only)")
+    parser.add_argument("--no-topics", action="store_true", help="Only summarize")
+    parser.add_argument("--no-resume", action="store_true", help="Reprocess files already in the output")
+    args = parser.parse_args(argv)
+
+    paths = find_documents(args.inputs)
+    skipped = 0
+    if not args.no_resume:
+        done = load_done(args.output)
+        skipped = sum(p in done for p in paths)
+        paths = [p for p in paths if p not in done]
+
+    print(f"{len(paths)} documents to process, {skipped} already done", file=sys.stderr)
+    if not paths:
+        return 0
+
+    # Default to an even split of the cores so workers don't oversubscribe them
+    threads = args.threads or max(1, (os.cpu_count() or 1) // max(1, args.workers))
+    stats = run(paths, args.output, args.workers, args.light, not args.no_topics, threads, args.backend,
+                args.topic_model)
+
+    seconds = stats["seconds"]
+    print(f"Processed {stats['processed']} documents ({stats['failed']} failed, {skipped} skipped) "
+          f"in {seconds:.1f}s: {stats['processed'] / seconds:.2f} docs/s, "
+          f"{stats['chars'] / seconds:,.0f} chars/s", file=sys.stderr)
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
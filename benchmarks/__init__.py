@@ -0,0 +1,2 @@
+# Benchmarks for the summarization and topic extraction pipeline.
+# Run them from the repository root, e.g. `python -m benchmarks.backends`.
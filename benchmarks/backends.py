@@ -0,0 +1,93 @@
+# Compare the summarizer inference backends against the fp32 PyTorch baseline
+#
+#   python -m benchmarks.backends                       # DistilBART, all backends
+#   python -m benchmarks.backends --light --repeat 5    # Falconsai T5
+#
+# Each backend runs in its own subprocess so peak memory is measured separately.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.metrics import percentile, rouge_l, rouge_n
+from tracing import process_peak_rss_mb
+
+SAMPLE_TEXT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Sample_Text.txt")
+
+
+def run_backend(backend, light, repeat, text_path):
+    """Load one backend, summarize the sample `repeat` times and report the numbers."""
+    if light:
+        import summarizer_01 as summarizer_module
+    else:
+        import summarizer as summarizer_module
+
+    with open(text_path, encoding="utf-8") as f:
+        text = f.read()
+
+    start_time = time.perf_counter()
+    summarizer = summarizer_module.initialize_summarizer(backend)
+    load_seconds = time.perf_counter() - start_time
+
+    latencies = []
+    summary = ""
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        summary = summarizer_module.generate_summary(text, summarizer)
+        latencies.append(time.perf_counter() - start_time)
+
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "p50_seconds": percentile(latencies, 50),
+        "p95_seconds": percentile(latencies, 95),
+        "peak_rss_mb": process_peak_rss_mb(),  # Each backend runs in its own process
+        "summary": summary,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark summarizer backends on Sample_Text.txt.")
+    parser.add_argument("--backends", nargs="+", default=["pytorch", "int8", "onnx"])
+    parser.add_argument("--light", action="store_true", help="Benchmark the Falconsai T5 summarizer")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--text", default=SAMPLE_TEXT)
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--run", help=argparse.SUPPRESS)  # Internal: run one backend in this process
+    args = parser.parse_args(argv)
+
+    if args.run:
+        print(json.dumps(run_backend(args.run, args.light, args.repeat, args.text)))
+        return 0
+
+    results = []
+    for backend in args.backends:
+        command = [sys.executable, "-m", "benchmarks.backends", "--run", backend,
+                   "--repeat", str(args.repeat), "--text", args.text] + (["--light"] if args.light else [])
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"{backend}: failed\n{completed.stderr.strip().splitlines()[-1:]}", file=sys.stderr)
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    # Quality is measured as agreement with the fp32 summary
+    baseline = next((r for r in results if r["backend"] == "pytorch"), None)
+    print(f"{'backend':<10}{'load s':>8}{'p50 s':>8}{'p95 s':>8}{'RSS MB':>9}{'R-1':>7}{'R-2':>7}{'R-L':>7}")
+    for r in results:
+        if baseline is not None:
+            r["rouge1"] = rouge_n(r["summary"], baseline["summary"], 1)
+            r["rouge2"] = rouge_n(r["summary"], baseline["summary"], 2)
+            r["rougeL"] = rouge_l(r["summary"], baseline["summary"])
+        print(f"{r['backend']:<10}{r['load_seconds']:>8.1f}{r['p50_seconds']:>8.2f}{r['p95_seconds']:>8.2f}"
+              f"{r['peak_rss_mb']:>9.0f}{r.get('rouge1', 0):>7.3f}{r.get('rouge2', 0):>7.3f}{r.get('rougeL', 0):>7.3f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
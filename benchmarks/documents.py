@@ -0,0 +1,76 @@
+# Synthetic benchmark inputs: scaled text documents and multi-page PDFs
+import os
+import random
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_TEXT = os.path.join(ROOT, "Sample_Text.txt")
+
+
+def sample_text():
+    with open(SAMPLE_TEXT, encoding="utf-8") as f:
+        return f.read()
+
+
+def synthetic_document(words, seed=0):
+    """Roughly `words` words of text built by reshuffling the sample's sentences."""
+    rng = random.Random(seed)
+    sentences = [s.strip() + "." for s in sample_text().replace("\n", " ").split(". ") if s.strip()]
+    paragraphs, paragraph, total = [], [], 0
+    while total < words:
+        sentence = rng.choice(sentences)
+        paragraph.append(sentence)
+        total += len(sentence.split())
+        if len(paragraph) >= 5:
+            paragraphs.append(" ".join(paragraph))
+            paragraph = []
+    if paragraph:
+        paragraphs.append(" ".join(paragraph))
+    return "\n\n".join(paragraphs)
+
+
+def _escape(line):
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(text, width=90):
+    lines = []
+    for paragraph in text.split("\n"):
+        line = ""
+        for word in paragraph.split():
+            if line and len(line) + len(word) + 1 > width:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        lines.append(line)
+    return lines
+
+
+def make_pdf(page_texts):
+    """Build a minimal text-only PDF (Helvetica, one content stream per page)."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        lines = _wrap(text)[:50]  # 50 lines of 14pt leading fit on a letter page
+        stream = "BT /F1 10 Tf 50 760 Td 14 TL " + " ".join(f"({_escape(l)}) '" for l in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R "
+                       "/Resources << /Font << /F1 3 0 R >> >> >>")
+        kids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>"
+
+    out, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1", "replace")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+def synthetic_pdf(pages, words_per_page=400, seed=0):
+    """A `pages`-page PDF of synthetic text."""
+    return make_pdf([synthetic_document(words_per_page, seed + i) for i in range(pages)])
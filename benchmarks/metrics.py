@@ -0,0 +1,43 @@
+# Small measurement helpers shared by the benchmarks
+from collections import Counter
+
+
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0-100) of a list of numbers."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def _ngrams(tokens, n):
+    return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+
+def _f1(overlap, candidate_total, reference_total):
+    if not overlap:
+        return 0.0
+    precision = overlap / candidate_total
+    recall = overlap / reference_total
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_n(candidate, reference, n=1):
+    """ROUGE-N F1 between two texts (lower-cased whitespace tokens)."""
+    cand, ref = _ngrams(candidate.lower().split(), n), _ngrams(reference.lower().split(), n)
+    return _f1(sum((cand & ref).values()), sum(cand.values()), sum(ref.values()))
+
+
+def rouge_l(candidate, reference):
+    """ROUGE-L F1 (longest common subsequence) between two texts."""
+    cand, ref = candidate.lower().split(), reference.lower().split()
+    if not cand or not ref:
+        return 0.0
+    previous = [0] * (len(ref) + 1)
+    for word in cand:
+        current = [0]
+        for j, ref_word in enumerate(ref):
+            current.append(previous[j] + 1 if word == ref_word else max(previous[j + 1], current[j]))
+        previous = current
+    return _f1(previous[-1], len(cand), len(ref))
@@ -0,0 +1,109 @@
+# Lightweight deterministic stand-ins for the real models, so the benchmarks run offline
+#
+# They implement only the parts of the Hugging Face pipeline, SentenceTransformer and
+# BERTopic interfaces that summarizer.py and topic_modeler.py call.
+import hashlib
+from types import SimpleNamespace
+
+import numpy as np
+
+
+class StubTokenizer:
+    """Whitespace tokenizer with a fixed vocabulary-free id per word."""
+
+    def __init__(self, model_max_length=1024):
+        self.model_max_length = model_max_length
+
+    def __call__(self, text, add_special_tokens=True):
+        if isinstance(text, list):
+            return {"input_ids": [t.split() for t in text]}
+        return {"input_ids": text.split()}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(ids)
+
+
+class StubSummarizer:
+    """Summarization 'pipeline' that keeps the first `max_length` words of each input."""
+
+    def __init__(self, model_max_length=1024, name="stub/summarizer"):
+        self.tokenizer = StubTokenizer(model_max_length)
+        self.model = SimpleNamespace(name_or_path=name)
+
+    def __call__(self, inputs, max_length=150, min_length=0, **kwargs):
+        def summarize(text):
+            return {"summary_text": " ".join(text.split()[:max_length])}
+        if isinstance(inputs, list):
+            return [summarize(text) for text in inputs]
+        return [summarize(inputs)]
+
+
+class StubSentenceModel:
+    """Sentence 'embeddings' from hashed bag-of-words features, L2-normalised."""
+
+    def __init__(self, dim=384, name="stub/sentence-model"):
+        self.dim = dim
+        self.model_card_data = SimpleNamespace(base_model=name)
+
+    def encode(self, sentences, batch_size=64, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        vectors = np.zeros((len(sentences), self.dim), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            for word in sentence.lower().split():
+                digest = hashlib.blake2b(word.encode("utf-8"), digest_size=4).digest()
+                vectors[row, int.from_bytes(digest, "little") % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+
+class StubTopicModel:
+    """BERTopic-like model: k-means on the embeddings and word counts per cluster."""
+
+    def __init__(self, n_topics=5, seed=42):
+        self.n_topics = n_topics
+        self.seed = seed
+        self.embedding_model = StubSentenceModel()
+        self._topics = {}
+        self._representative = {}
+        self._sizes = {}
+
+    def get_params(self):
+        return {"n_topics": self.n_topics, "seed": self.seed, "embedding_model": self.embedding_model}
+
+    def fit_transform(self, docs, embeddings=None):
+        if embeddings is None:
+            embeddings = self.embedding_model.encode(docs)
+        k = min(self.n_topics, len(docs))
+
+        # A few rounds of k-means from deterministic starting points
+        rng = np.random.default_rng(self.seed)
+        centers = embeddings[rng.choice(len(docs), k, replace=False)]
+        for _ in range(10):
+            labels = np.argmax(embeddings @ centers.T, axis=1)
+            for c in range(k):
+                members = embeddings[labels == c]
+                if len(members):
+                    centers[c] = members.mean(axis=0)
+
+        self._topics, self._representative, self._sizes = {}, {}, {}
+        for c in range(k):
+            idx = np.flatnonzero(labels == c)
+            if not len(idx):
+                continue
+            counts = {}
+            for i in idx:
+                for word in docs[i].lower().split():
+                    counts[word] = counts.get(word, 0) + 1
+            self._topics[c] = sorted(counts.items(), key=lambda item: -item[1])[:10]
+            self._representative[c] = [docs[idx[0]]]
+            self._sizes[c] = len(idx)
+        return labels.tolist(), None
+
+    def get_topic_info(self):
+        import pandas as pd
+        return pd.DataFrame({"Topic": list(self._sizes), "Count": list(self._sizes.values())})
+
+    def get_topic(self, topic_id):
+        return self._topics.get(topic_id, False)
+
+    def get_representative_docs(self, topic_id):
+        return self._representative.get(topic_id)
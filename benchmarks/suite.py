@@ -0,0 +1,168 @@
+# Benchmark every pipeline stage on scaled inputs and compare against a saved baseline
+#
+#   python -m benchmarks.suite --output bench.json                  # stub models, fully offline
+#   python -m benchmarks.suite --models real --sizes 1000 10000     # locally cached real models
+#   python -m benchmarks.suite --baseline bench.json                # fail on regressions
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+from benchmarks.documents import sample_text, synthetic_document, synthetic_pdf
+from benchmarks.metrics import percentile
+from preprocess import preprocess
+from tracing import span, trace
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+DEFAULT_PDF_PAGES = [1, 10, 100]
+
+
+def load_models(kind):
+    """Return (summarizer module, summarizer, topic modeler module, topic model)."""
+    import summarizer
+    import topic_modeler
+    if kind == "stub":
+        from benchmarks.stubs import StubSummarizer, StubTopicModel
+        return summarizer, StubSummarizer(), topic_modeler, StubTopicModel()
+
+    # Real models, but never reach out to the Hugging Face Hub
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+    return (summarizer, summarizer.initialize_summarizer(),
+            topic_modeler, topic_modeler.initialize_topic_model())
+
+
+def measure(fn, repeat):
+    """Call `fn` once to warm up, then `repeat` times.
+
+    Returns the wall-clock latencies and the highest RSS sampled during the timed calls.
+    """
+    fn()  # Lazy imports and first-call caches should not count
+    latencies = []
+    peak_mb = 0.0
+    for _ in range(repeat):
+        with trace(), span("measure") as s:
+            start_time = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - start_time)
+        peak_mb = max(peak_mb, s.peak_rss_mb)
+    return latencies, peak_mb
+
+
+def record(stage, label, words, measured, **extra):
+    latencies, peak_mb = measured
+    p50 = percentile(latencies, 50)
+    result = {
+        "stage": stage,
+        "input": label,
+        "words": words,
+        "runs": len(latencies),
+        "p50_seconds": p50,
+        "p95_seconds": percentile(latencies, 95),
+        "words_per_second": words / p50 if p50 else None,
+        "peak_rss_mb": peak_mb,  # Peak while this stage ran
+    }
+    result.update(extra)
+    print(f"{stage:<22}{label:<10}{result['p50_seconds']:>10.4f}s p50{result['p95_seconds']:>10.4f}s p95"
+          f"{result['peak_rss_mb']:>9.0f} MB", file=sys.stderr)
+    return result
+
+
+def run_suite(models="stub", sizes=DEFAULT_SIZES, pdf_pages=DEFAULT_PDF_PAGES, repeat=3,
+              stages=("preprocess", "chunk_text", "generate_summary", "extract_topics", "extract_text_from_pdf")):
+    summarizer_module, summarizer, topic_module, topic_model = load_models(models)
+    tokenizer = getattr(summarizer, "tokenizer", None)
+
+    documents = [("sample", sample_text())] + [(f"{n}w", synthetic_document(n)) for n in sizes]
+    results = []
+    for label, text in documents:
+        words = len(text.split())
+        if "preprocess" in stages:
+            results.append(record("preprocess", label, words, measure(lambda: preprocess(text), repeat),
+                                  sentences=len(preprocess(text))))
+        if "chunk_text" in stages:
+            results.append(record("chunk_text", label, words, measure(
+                lambda: summarizer_module.chunk_text(text, tokenizer=tokenizer), repeat),
+                chunks=len(summarizer_module.chunk_text(text, tokenizer=tokenizer))))
+            results.append(record("chunk_text_chars", label, words, measure(
+                lambda: summarizer_module.chunk_text(text), repeat)))
+        if "generate_summary" in stages:
+            results.append(record("generate_summary", label, words, measure(
+                lambda: summarizer_module.generate_summary(text, summarizer), repeat)))
+        if "extract_topics" in stages:
+            results.append(record("extract_topics", label, words, measure(
+                lambda: topic_module.extract_topics(text, topic_model), repeat)))
+
+    if "extract_text_from_pdf" in stages:
+        from pdf_processor import extract_text_from_pdf
+        for pages in pdf_pages:
+            data = synthetic_pdf(pages)
+            words = len(extract_text_from_pdf(io.BytesIO(data)).split())
+            results.append(record("extract_text_from_pdf", f"{pages}p", words, measure(
+                lambda: extract_text_from_pdf(io.BytesIO(data)), repeat), pages=pages))
+
+    return {
+        "meta": {
+            "models": models,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance=0.2):
+    """Print p50 changes against a baseline report; return the regressions beyond `tolerance`."""
+    before = {(r["stage"], r["input"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"{'stage':<22}{'input':<10}{'baseline':>11}{'now':>11}{'change':>9}")
+    for r in report["results"]:
+        old = before.get((r["stage"], r["input"]))
+        if old is None or not old["p50_seconds"]:
+            continue
+        change = r["p50_seconds"] / old["p50_seconds"] - 1
+        flag = "  REGRESSION" if change > tolerance else ""
+        print(f"{r['stage']:<22}{r['input']:<10}{old['p50_seconds']:>10.4f}s{r['p50_seconds']:>10.4f}s"
+              f"{change:>+8.0%}{flag}")
+        if flag:
+            regressions.append((r["stage"], r["input"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the summarization and topic extraction stages.")
+    parser.add_argument("--models", choices=["stub", "real"], default="stub",
+                        help="stub: deterministic offline models; real: locally cached models")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Synthetic document sizes in words")
+    parser.add_argument("--pdf-pages", type=int, nargs="+", default=DEFAULT_PDF_PAGES)
+    parser.add_argument("--stages", nargs="+",
+                        default=["preprocess", "chunk_text", "generate_summary", "extract_topics", "extract_text_from_pdf"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare against a saved JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p50 slowdown before failing")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.models, args.sizes, args.pdf_pages, args.repeat, args.stages)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+# Searchable archive of processed documents: passage embeddings, topics and an ANN index
+import atexit
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:  # Optional: exact numpy search is used instead
+    hnswlib = None
+
+# Rows scored at a time by the exact search, to bound its memory use
+_SEARCH_BLOCK = 65536
+
+
+class CorpusStore:
+    """Every processed document's passages, embeddings and topics for one embedding model.
+
+    The directory holds ``vectors.f32`` (normalized float32 rows, memory-mapped and
+    append-only), ``corpus.sqlite`` (documents, passages and topics) and, when
+    hnswlib is installed, ``index.hnsw``, an HNSW index that is updated in memory as
+    documents are added and saved every `save_every` new rows and on close(). An index
+    file that is behind the vectors is caught up on open. Without hnswlib, searches
+    scan the vectors exactly.
+    """
+
+    def __init__(self, directory=".cache/corpus", model_name="all-MiniLM-L6-v2", ef=64, m=16, save_every=10000):
+        self.model_name = model_name
+        self.ef = ef
+        self.m = m
+        self.save_every = save_every
+        self._unsaved = 0  # Rows added to the index since it was last saved
+        self.path = os.path.join(directory, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+        os.makedirs(self.path, exist_ok=True)
+        self._vectors_path = os.path.join(self.path, "vectors.f32")
+        self._index_path = os.path.join(self.path, "index.hnsw")
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(os.path.join(self.path, "corpus.sqlite"), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY, key TEXT UNIQUE, title TEXT, added REAL, first_row INTEGER, rows INTEGER);
+            CREATE TABLE IF NOT EXISTS passages (
+                row INTEGER PRIMARY KEY, document_id INTEGER, position INTEGER, text TEXT, topic INTEGER);
+            CREATE TABLE IF NOT EXISTS topics (
+                document_id INTEGER, topic INTEGER, label TEXT, representative TEXT, size INTEGER,
+                representative_row INTEGER);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER);
+            CREATE INDEX IF NOT EXISTS passages_document ON passages (document_id);
+            CREATE INDEX IF NOT EXISTS topics_size ON topics (size DESC);
+        """)
+        dim = self._db.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        self._dim = dim[0] if dim else None
+        self._memmap = None
+        self._index = None
+        if self._dim is not None:
+            self._open_index()
+        atexit.register(self.close)  # Save the index rows added since the last save
+
+    def contains(self, key):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM documents WHERE key = ?", (key,)).fetchone() is not None
+
+    def add_document(self, key, title, passages, embeddings, passage_topics=None, topics=()):
+        """Store a document's passages with their embeddings and topics; returns its id.
+
+        passage_topics: topic id of each passage (-1 for outliers).
+        topics: (topic id, label, representative passage) of each topic.
+        A document whose key is already stored is not added again.
+        """
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        if passage_topics is None:
+            passage_topics = [-1] * len(passages)
+        sizes = {}
+        for topic in passage_topics:
+            sizes[int(topic)] = sizes.get(int(topic), 0) + 1
+        positions = {}  # Passage text -> its first position, to find each topic's representative
+        for i, text in enumerate(passages):
+            positions.setdefault(text, i)
+
+        with self._lock:
+            existing = self._db.execute("SELECT id FROM documents WHERE key = ?", (key,)).fetchone()
+            if existing:
+                return existing[0]
+            if self._dim is not None and vectors.shape[1] != self._dim:
+                raise ValueError(f"Corpus holds {self._dim}-d embeddings, got {vectors.shape[1]}-d")
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+                self._db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)", (self._dim,))
+                self._open_index()
+
+            # Rows are numbered by their position in the vectors file
+            with open(self._vectors_path, "ab") as f:
+                first_row = f.tell() // (4 * self._dim)
+                f.write(vectors.tobytes())
+            self._memmap = None  # Re-map to pick up the new rows
+
+            document_id = self._db.execute(
+                "INSERT INTO documents (key, title, added, first_row, rows) VALUES (?, ?, ?, ?, ?)",
+                (key, title, time.time(), first_row, len(passages))).lastrowid
+            self._db.executemany(
+                "INSERT INTO passages (row, document_id, position, text, topic) VALUES (?, ?, ?, ?, ?)",
+                [(first_row + i, document_id, i, text, int(topic))
+                 for i, (text, topic) in enumerate(zip(passages, passage_topics))])
+            self._db.executemany(
+                "INSERT INTO topics (document_id, topic, label, representative, size, representative_row) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(document_id, int(topic), label, representative, sizes.get(int(topic), 0),
+                  first_row + positions[representative] if representative in positions else None)
+                 for topic, label, representative in topics])
+            self._db.commit()
+
+            if self._index is not None:
+                self._grow_index(first_row + len(passages))
+                self._index.add_items(vectors, np.arange(first_row, first_row + len(passages)))
+                self._unsaved += len(passages)
+                if self._unsaved >= self.save_every:
+                    self._save_index()
+            return document_id
+
+    def search(self, vector, k=10, exclude_document=None):
+        """The `k` passages most similar to `vector`, best first."""
+        query = np.asarray(vector, dtype=np.float32).ravel()
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        with self._lock:
+            if self._dim is None:
+                return []
+            excluded = None
+            if exclude_document is not None:
+                excluded = self._db.execute("SELECT first_row, rows FROM documents WHERE id = ?",
+                                            (exclude_document,)).fetchone()
+            if self._index is not None:
+                rows, scores = self._search_index(query, k, excluded)
+            else:
+                rows, scores = self._search_exact(query, k, excluded)
+            return self._passages(rows, scores)
+
+    def search_text(self, text, sentence_model, k=10, exclude_document=None):
+        """Encode `text` with the corpus's sentence model and search for similar passages."""
+        vector = sentence_model.encode([text], show_progress_bar=False)[0]
+        return self.search(vector, k, exclude_document)
+
+    def similar_passages(self, row, k=10):
+        """Passages from other documents that are closest to a stored passage."""
+        with self._lock:
+            document_id = self._db.execute("SELECT document_id FROM passages WHERE row = ?", (row,)).fetchone()
+            vector = np.array(self._vectors()[row])
+        return self.search(vector, k, exclude_document=document_id[0] if document_id else None)
+
+    def documents(self):
+        with self._lock:
+            return [{"id": i, "title": title, "added": added, "passages": rows}
+                    for i, title, added, rows in self._db.execute(
+                        "SELECT id, title, added, rows FROM documents ORDER BY added DESC")]
+
+    def topics(self, query=None, limit=50):
+        """The `limit` biggest topics of all stored documents (optionally those whose label contains `query`)."""
+        sql = ("SELECT t.document_id, d.title, t.topic, t.label, t.representative, t.size, t.representative_row "
+               "FROM topics t JOIN documents d ON d.id = t.document_id")
+        params = ()
+        if query:
+            sql += " WHERE t.label LIKE ?"
+            params = (f"%{query}%",)
+        with self._lock:
+            return [{"document_id": doc_id, "title": title, "topic": topic, "label": label,
+                     "representative": representative, "size": size, "row": row}
+                    for doc_id, title, topic, label, representative, size, row in
+                    self._db.execute(sql + " ORDER BY t.size DESC LIMIT ?", params + (limit,))]
+
+    def flush(self):
+        """Save the index if rows were added since it was last saved."""
+        with self._lock:
+            if self._index is not None and self._unsaved:
+                self._save_index()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._db.close()
+            self._index = None
+        atexit.unregister(self.close)
+
+    def stats(self):
+        with self._lock:
+            documents, passages = self._db.execute("SELECT COUNT(*), COALESCE(SUM(rows), 0) FROM documents").fetchone()
+        return {"documents": documents, "passages": passages, "index": "hnsw" if self._index is not None else "exact"}
+
+    def _vectors(self):
+        if self._memmap is None:
+            rows = os.path.getsize(self._vectors_path) // (4 * self._dim) if os.path.exists(self._vectors_path) else 0
+            self._memmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim)) \
+                if rows else np.zeros((0, self._dim), dtype=np.float32)
+        return self._memmap
+
+    def _open_index(self):
+        """Load the HNSW index, adding the rows it is missing (or building it if there is none)."""
+        if hnswlib is None:
+            return
+        vectors = self._vectors()
+        index = hnswlib.Index(space="ip", dim=self._dim)
+        count = 0
+        if os.path.exists(self._index_path):
+            index.load_index(self._index_path, max_elements=max(len(vectors), 1024))
+            count = index.get_current_count()
+        if count == 0 or count > len(vectors):  # No index, or one built from other vectors
+            index, count = hnswlib.Index(space="ip", dim=self._dim), 0
+            index.init_index(max_elements=max(len(vectors), 1024), ef_construction=200, M=self.m)
+        # Rows are added in order, so the ones past the saved count are the missing ones
+        if count < len(vectors):
+            index.add_items(np.asarray(vectors[count:]), np.arange(count, len(vectors)))
+        index.set_ef(self.ef)
+        self._index = index
+        if count < len(vectors):
+            self._save_index()
+
+    def _save_index(self):
+        # Written to a temporary file and renamed, so a crash mid-save keeps the old index
+        tmp = f"{self._index_path}.tmp-{os.getpid()}"
+        self._index.save_index(tmp)
+        os.replace(tmp, self._index_path)
+        self._unsaved = 0
+
+    def _grow_index(self, needed):
+        capacity = self._index.get_max_elements()
+        if needed > capacity:
+            self._index.resize_index(max(needed, 2 * capacity))
+
+    def _search_index(self, query, k, excluded):
+        count = self._index.get_current_count()
+        if not count:
+            return [], []
+        fetch = min(count, k + (excluded[1] if excluded else 0))
+        self._index.set_ef(max(self.ef, fetch))
+        labels, distances = self._index.knn_query(query, k=fetch)
+        rows, scores = [], []
+        for row, distance in zip(labels[0], distances[0]):
+            if excluded and excluded[0] <= row < excluded[0] + excluded[1]:
+                continue
+            rows.append(int(row))
+            scores.append(1.0 - float(distance))  # hnswlib's "ip" distance is 1 - dot product
+        return rows[:k], scores[:k]
+
+    def _search_exact(self, query, k, excluded):
+        vectors = self._vectors()
+        best_rows, best_scores = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        for start in range(0, len(vectors), _SEARCH_BLOCK):
+            scores = np.asarray(vectors[start:start + _SEARCH_BLOCK]) @ query
+            if excluded:
+                low, high = max(excluded[0] - start, 0), max(min(excluded[0] + excluded[1] - start, len(scores)), 0)
+                scores[low:high] = -np.inf
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            best_rows = np.concatenate([best_rows, top + start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+        order = np.argsort(-best_scores)[:k]
+        keep = [i for i in order if np.isfinite(best_scores[i])]
+        return best_rows[keep].tolist(), best_scores[keep].tolist()
+
+    def _passages(self, rows, scores):
+        if not rows:
+            return []
+        placeholders = ",".join("?" * len(rows))
+        found = {row: (text, doc_id, title, position, topic) for row, text, doc_id, title, position, topic in
+                 self._db.execute(f"SELECT p.row, p.text, p.document_id, d.title, p.position, p.topic "
+                                  f"FROM passages p JOIN documents d ON d.id = p.document_id "
+                                  f"WHERE p.row IN ({placeholders})", rows)}
+        return [{"score": score, "row": row, "text": found[row][0], "document_id": found[row][1],
+                 "title": found[row][2], "position": found[row][3], "topic": found[row][4]}
+                for row, score in zip(rows, scores) if row in found]
@@ -0,0 +1,118 @@
+# Boilerplate and near-duplicate removal, run before chunking and embedding
+#
+# PDFs repeat running headers, footers, page numbers and disclaimers on every page,
+# and long documents often repeat whole sentences. Both waste generate calls and
+# skew the topics, so they are dropped once, while the document is preprocessed.
+import re
+import zlib
+from collections import Counter, defaultdict
+
+import numpy as np
+
+# Pages in extracted PDF text are separated by form feeds (see pdf_processor.py)
+PAGE_BREAK = "\f"
+
+# Numbers in header/footer lines are masked so "Page 3 of 12" and "Page 4 of 12" count as the same line
+_NUMBER = re.compile(r"\d+")
+_PAGE_NUMBER = re.compile(r"^(page )?#( (of|/) #)?$")
+_WORD = re.compile(r"\w+")
+
+# MinHash signature size and LSH banding (16 bands of 4 rows finds pairs above
+# ~0.5 Jaccard similarity as candidates; they are then checked exactly)
+NUM_PERM = 64
+BANDS = 16
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(42)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.int64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.int64)
+
+
+def _line_key(line, masked):
+    key = " ".join(line.lower().split())
+    return _NUMBER.sub("#", key) if masked else key
+
+
+def _page_keys(lines, edge_lines):
+    """Key of every line of a page; only header and footer lines get their numbers masked."""
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    edges = set(filled[:edge_lines] + filled[-edge_lines:])
+    first_last = {filled[0], filled[-1]} if filled else set()
+    return [(_line_key(line, i in edges), i in first_last) for i, line in enumerate(lines)]
+
+
+def strip_repeated_lines(pages, min_share=0.5, min_pages=3, edge_lines=3):
+    """Remove lines that repeat on at least `min_share` of the pages, and bare page numbers.
+
+    Returns `(pages, dropped_chars)`. Numbers are masked only in the first and last
+    `edge_lines` lines of each page (where running headers and footers live), so
+    body lines that differ only in their figures are kept. Page numbers are only
+    dropped as the first or last line of a page. Single pages (including pasted
+    text) are returned unchanged, and documents with fewer than `min_pages` pages
+    only lose their page numbers.
+    """
+    if len(pages) < 2:
+        return list(pages), 0
+    page_lines = [page.split("\n") for page in pages]
+    page_keys = [_page_keys(lines, edge_lines) for lines in page_lines]
+    repeated = set()
+    if len(pages) >= min_pages:
+        counts = Counter(key for keys, lines in zip(page_keys, page_lines)
+                         for key in {k for (k, _), l in zip(keys, lines) if l.strip()})
+        limit = max(2, min_share * len(pages))
+        repeated = {key for key, count in counts.items() if count >= limit}
+
+    cleaned, dropped = [], 0
+    for lines, keys in zip(page_lines, page_keys):
+        kept = []
+        for line, (key, first_or_last) in zip(lines, keys):
+            if key in repeated or (first_or_last and _PAGE_NUMBER.match(key)):
+                dropped += len(line)
+            else:
+                kept.append(line)
+        cleaned.append("\n".join(kept))
+    return cleaned, dropped
+
+
+def _shingles(sentence, size=3):
+    """Hashes of the word `size`-grams of a sentence."""
+    words = _WORD.findall(sentence.lower())
+    grams = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+    return {zlib.crc32(gram.encode("utf-8")) for gram in grams}
+
+
+def _minhash(shingles):
+    hashes = np.fromiter(shingles, dtype=np.int64, count=len(shingles))
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def near_duplicates(sentences, threshold=0.8, min_words=4):
+    """Indices of sentences that repeat an earlier one (exactly, or with Jaccard >= threshold)."""
+    rows = NUM_PERM // BANDS
+    buckets = defaultdict(list)  # (band, band signature) -> earlier kept sentences
+    kept_shingles = []
+    seen = set()
+    duplicates = []
+    for i, sentence in enumerate(sentences):
+        # Exact repeats (ignoring case, spacing and punctuation) are cheap to catch
+        words = _WORD.findall(sentence.lower())
+        exact = " ".join(words)
+        if exact in seen:
+            duplicates.append(i)
+            continue
+        seen.add(exact)
+        if len(words) < min_words:
+            continue
+
+        # Near repeats: compare only against sentences sharing an LSH band
+        shingles = _shingles(sentence)
+        signature = _minhash(shingles)
+        keys = [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(BANDS)]
+        candidates = {j for key in keys for j in buckets.get(key, ())}
+        if any(len(shingles & kept_shingles[j]) >= threshold * len(shingles | kept_shingles[j])
+               for j in candidates):
+            duplicates.append(i)
+            continue
+        for key in keys:
+            buckets[key].append(len(kept_shingles))
+        kept_shingles.append(shingles)
+    return duplicates
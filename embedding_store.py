@@ -0,0 +1,122 @@
+# Persistent per-sentence embedding cache shared across requests
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+
+def sentence_key(sentence: str, model_name: str) -> str:
+    """Hash a sentence together with the model that embeds it."""
+    return hashlib.sha256(f"{model_name}\0{sentence}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Sentence embeddings kept in a memory-mapped float32 file per model.
+
+    Each model gets its own directory holding ``vectors.f32`` (rows of
+    float32 values) and ``index.sqlite`` (sentence hash -> row number).
+    Vectors are only ever appended, so existing rows never move.
+    """
+
+    def __init__(self, directory=".cache/embeddings"):
+        self.directory = directory
+        self._models = {}  # model name -> open store state
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, sentences, model, model_name: str, batch_size: int = 64) -> np.ndarray:
+        """Return embeddings for `sentences`, encoding only the ones not stored yet."""
+        if not sentences:
+            return np.zeros((0, 0), dtype=np.float32)
+        keys = [sentence_key(s, model_name) for s in sentences]
+        with self._lock:
+            state = self._open(model_name)
+            rows = self._lookup(state, keys)
+
+            # Encode each missing sentence once, even if it repeats in the input
+            missing = {}
+            for key, sentence, row in zip(keys, sentences, rows):
+                if row is None and key not in missing:
+                    missing[key] = sentence
+            self.hits += len(keys) - sum(row is None for row in rows)
+            self.misses += len(missing)
+            if not missing:
+                return np.array(self._vectors(state)[rows])
+
+        # Encode without holding the lock, so sessions don't wait on each other's encoding
+        vectors = model.encode(list(missing.values()), batch_size=batch_size,
+                               convert_to_numpy=True, show_progress_bar=False)
+        vectors = np.asarray(vectors, dtype=np.float32)
+
+        with self._lock:
+            # Another session may have stored some of the same sentences meanwhile
+            stored = self._lookup(state, list(missing))
+            new = [i for i, row in enumerate(stored) if row is None]
+            if new:
+                self._append(state, [list(missing)[i] for i in new], vectors[new])
+            rows = self._lookup(state, keys)
+            return np.array(self._vectors(state)[rows])
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def _open(self, model_name):
+        state = self._models.get(model_name)
+        if state is not None:
+            return state
+
+        path = os.path.join(self.directory, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+        os.makedirs(path, exist_ok=True)
+        db = sqlite3.connect(os.path.join(path, "index.sqlite"), check_same_thread=False)
+        db.execute("CREATE TABLE IF NOT EXISTS sentences (key TEXT PRIMARY KEY, row INTEGER)")
+        db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+        db.commit()
+        dim = db.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+
+        state = {
+            "db": db,
+            "vectors_path": os.path.join(path, "vectors.f32"),
+            "dim": dim[0] if dim else None,
+            "memmap": None,
+        }
+        self._models[model_name] = state
+        return state
+
+    def _lookup(self, state, keys):
+        found = {}
+        unique = list(set(keys))
+        # SQLite limits the number of bound parameters, so query in slices
+        for i in range(0, len(unique), 500):
+            part = unique[i:i + 500]
+            placeholders = ",".join("?" * len(part))
+            for key, row in state["db"].execute(
+                    f"SELECT key, row FROM sentences WHERE key IN ({placeholders})", part):
+                found[key] = row
+        return [found.get(key) for key in keys]
+
+    def _append(self, state, keys, vectors):
+        db = state["db"]
+        if state["dim"] is None:
+            state["dim"] = vectors.shape[1]
+            db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)", (state["dim"],))
+
+        # Rows are numbered by their position in the vectors file
+        with open(state["vectors_path"], "ab") as f:
+            start = f.tell() // (4 * state["dim"])
+            f.write(vectors.tobytes())
+        db.executemany("INSERT OR REPLACE INTO sentences (key, row) VALUES (?, ?)",
+                       [(key, start + i) for i, key in enumerate(keys)])
+        db.commit()
+        state["memmap"] = None  # Re-map to pick up the new rows
+
+    def _vectors(self, state):
+        if state["memmap"] is None:
+            rows = os.path.getsize(state["vectors_path"]) // (4 * state["dim"])
+            state["memmap"] = np.memmap(state["vectors_path"], dtype=np.float32, mode="r",
+                                        shape=(rows, state["dim"]))
+        return state["memmap"]
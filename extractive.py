@@ -0,0 +1,67 @@
+# Extractive pre-selection: keep the most central sentences before the abstractive pass
+#
+# Sentences are embedded with the topic modeler's SentenceTransformer and ranked by
+# TextRank (or centrality on long documents). The top fraction, kept in document
+# order, is what the summarizer has to read, or is shown directly as a preview.
+import math
+
+import numpy as np
+
+from preprocess import preprocess
+from topic_modeler import get_sentence_model, sentence_model_name
+from tracing import span
+
+# Above this many sentences the n x n similarity matrix gets too big; use centrality
+TEXTRANK_MAX_SENTENCES = 2000
+
+
+def embed_sentences(sentences, model, embedding_store=None):
+    """L2-normalized embeddings of `sentences` (model may be a SentenceTransformer or a topic model)."""
+    sentence_model = get_sentence_model(model) if hasattr(model, "embedding_model") else model
+    with span("embed", sentences=len(sentences), store=embedding_store is not None):
+        if embedding_store is not None:
+            embeddings = embedding_store.encode(sentences, sentence_model, sentence_model_name(sentence_model))
+        else:
+            embeddings = sentence_model.encode(sentences, show_progress_bar=False)
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    return embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+
+def score_sentences(embeddings, method="textrank", damping=0.85, iterations=50, tolerance=1e-6):
+    """Importance score for every sentence from its normalized embedding."""
+    if method not in ("textrank", "centrality"):
+        raise ValueError(f"Unknown scoring method: {method}")
+    n = len(embeddings)
+    if method == "centrality" or n > TEXTRANK_MAX_SENTENCES:
+        # Mean cosine similarity to every sentence = similarity to the document centroid
+        return embeddings @ embeddings.mean(axis=0)
+
+    # TextRank: PageRank over the graph of positive cosine similarities
+    similarity = np.clip(embeddings @ embeddings.T, 0.0, None)
+    np.fill_diagonal(similarity, 0.0)
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, out_weight, out=np.full_like(similarity, 1.0 / n), where=out_weight > 0)
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tolerance:
+            return updated
+        scores = updated
+    return scores
+
+
+def select_sentences(text, model, ratio=0.2, method="textrank", embedding_store=None, min_sentences=3):
+    """Return a Document with the top `ratio` of sentences, in their original order."""
+    doc = preprocess(text)
+    keep = max(min_sentences, math.ceil(ratio * len(doc)))
+    if len(doc) <= keep:
+        return doc
+    with span("extractive", sentences=len(doc), kept=keep, method=method):
+        scores = score_sentences(embed_sentences(doc.sentences, model, embedding_store), method)
+        top = np.sort(np.argpartition(-scores, keep - 1)[:keep])
+        return doc.select(top.tolist())
+
+
+def extractive_summary(text, model, ratio=0.2, method="textrank", embedding_store=None, min_sentences=3):
+    """Instant preview: the most central sentences joined together, no generation."""
+    return select_sentences(text, model, ratio, method, embedding_store, min_sentences).text
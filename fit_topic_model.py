@@ -0,0 +1,35 @@
+# Fit a topic model once on a reference corpus so requests only need `transform`
+#
+# Example:
+#   python fit_topic_model.py corpus/ -o models/topics
+#   TOPIC_MODEL_PATH=models/topics streamlit run app.py
+import argparse
+import sys
+import time
+
+from batch_process import find_documents, read_document
+from topic_modeler import fit_reference_model, split_topic_sentences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit and save a reference topic model.")
+    parser.add_argument("inputs", nargs="+", help="Files, directories or glob patterns (PDF/.txt)")
+    parser.add_argument("-o", "--output", required=True, help="Directory to save the model to")
+    parser.add_argument("--embedding-model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--online", action="store_true",
+                        help="Fit an online model (IncrementalPCA + MiniBatchKMeans) that keeps learning")
+    args = parser.parse_args(argv)
+
+    docs = []
+    for path in find_documents(args.inputs):
+        docs.extend(split_topic_sentences(read_document(path)))
+    print(f"Fitting on {len(docs)} sentences...", file=sys.stderr)
+
+    start_time = time.time()
+    fit_reference_model(docs, args.output, args.embedding_model, args.online)
+    print(f"Saved to {args.output} in {time.time() - start_time:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+# Shared in-process summarization service that micro-batches chunks across concurrent requests
+#
+# Every session hands its chunks to one worker thread instead of calling the pipeline
+# directly. The worker waits up to `max_wait` seconds to fill a batch, so ten users
+# clicking at once share a few large generate calls instead of fighting over cores.
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from pipeline_executor import set_thread_budget
+from summarizer import length_limits, count_tokens, summarize_chunks
+from tracing import current_position, current_profile_sink, graft, run_profiled, traced
+
+
+class ServiceOverloaded(RuntimeError):
+    """The request queue stayed full for longer than the request was willing to wait."""
+
+
+class _Request:
+    __slots__ = ("chunk", "default_max_length", "deadline", "future", "trace_position", "profile_sink")
+
+    def __init__(self, chunk, default_max_length, deadline, trace_position=None, profile_sink=None):
+        self.chunk = chunk
+        self.default_max_length = default_max_length
+        self.deadline = deadline
+        self.future = Future()
+        self.trace_position = trace_position  # The caller's trace and span, if it is tracing
+        self.profile_sink = profile_sink      # The caller's profile() block, if it is profiling
+
+
+class InferenceService:
+    """Bounded queue + one worker thread that runs the summarizer on micro-batches.
+
+    Pass the service wherever a summarizer pipeline is expected: generate_summary
+    hands it whole chunk lists and the service batches them with other requests.
+    """
+
+    def __init__(self, summarizer, max_batch_size=16, max_wait=0.02, max_queue=256,
+                 timeout=300.0, threads=None):
+        self.summarizer = summarizer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.threads = threads  # Thread budget for generation; may be changed while running
+
+        # Expose the pipeline's tokenizer, model and cache tag so chunking and cache keys still work
+        self.tokenizer = getattr(summarizer, "tokenizer", None)
+        self.model = getattr(summarizer, "model", None)
+        self.cache_tag = getattr(summarizer, "cache_tag", None)
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._requests = 0
+        self._timeouts = 0
+        self._rejected = 0
+        self._worker = threading.Thread(target=self._run, name="inference-service", daemon=True)
+        self._worker.start()
+
+    def submit(self, chunk, default_max_length=150, timeout=None):
+        """Queue one chunk and return a Future for its summary.
+
+        Blocks while the queue is full (backpressure) and raises ServiceOverloaded
+        if no space frees up within `timeout` seconds.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        request = _Request(chunk, default_max_length, time.monotonic() + timeout, current_position(),
+                           current_profile_sink())
+        try:
+            self._queue.put(request, timeout=timeout)
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            raise ServiceOverloaded(f"Inference queue full for {timeout:.0f}s") from None
+        with self._lock:
+            self._requests += 1
+        return request.future
+
+    def summarize_chunks(self, chunks, default_max_length=150, timeout=None):
+        """Summarize a list of chunks, returning summaries (or error markers) in order."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        futures = []
+        for chunk in chunks:
+            try:
+                futures.append(self.submit(chunk, default_max_length, max(0.0, deadline - time.monotonic())))
+            except ServiceOverloaded as e:
+                futures.append(e)
+
+        summaries = []
+        for future in futures:
+            if isinstance(future, Exception):
+                summaries.append(f"[Summarization failed: {future}]")
+                continue
+            try:
+                summaries.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except Exception as e:
+                summaries.append(f"[Summarization failed: {str(e) or type(e).__name__}]")
+        return summaries
+
+    def metrics(self):
+        with self._lock:
+            batches = sum(self._batch_sizes.values())
+            chunks = sum(size * count for size, count in self._batch_sizes.items())
+            return {
+                "queue_depth": self._queue.qsize(),
+                "requests": self._requests,
+                "batches": batches,
+                "mean_batch_size": chunks / batches if batches else 0.0,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "timeouts": self._timeouts,
+                "rejected": self._rejected,
+            }
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    def _next_batch(self):
+        """Block for the first request, then collect more until the batch is full or max_wait passes."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        flush_at = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = flush_at - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)  # Stop after this batch
+                break
+            batch.append(request)
+        return batch
+
+    def _lengths(self, chunks):
+        if self.tokenizer is not None:
+            try:
+                return [len(ids) for ids in self.tokenizer(chunks, add_special_tokens=False)["input_ids"]]
+            except Exception:
+                pass  # Fall back to the word-based estimate rather than stopping the worker
+        return [count_tokens(chunk) for chunk in chunks]
+
+    def _run(self):
+        applied_threads = None
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if self.threads and self.threads != applied_threads:
+                set_thread_budget(self.threads)  # Takes effect for this worker thread only
+                applied_threads = self.threads
+
+            # Drop requests whose caller has already given up
+            now = time.monotonic()
+            live = []
+            for request in batch:
+                if request.deadline < now or not request.future.set_running_or_notify_cancel():
+                    if not request.future.done():
+                        request.future.set_exception(TimeoutError("timed out in queue"))
+                    with self._lock:
+                        self._timeouts += 1
+                else:
+                    live.append(request)
+
+            # Only chunks with the same length limits can share a generate call, so a short
+            # chunk from one caller never caps the summaries of another caller's long chunks
+            groups = {}
+            lengths = self._lengths([r.chunk for r in live]) if live else []
+            for request, length in zip(live, lengths):
+                limits = length_limits(length, request.default_max_length)
+                groups.setdefault((request.default_max_length, limits), []).append(request)
+            for (default_max_length, _), requests in groups.items():
+                with self._lock:
+                    self._batch_sizes[len(requests)] += 1
+                # Profile the batch for every caller that is profiling (the worker is not in their context)
+                sinks = list({id(r.profile_sink): r.profile_sink for r in requests
+                              if r.profile_sink is not None}.values())
+                try:
+                    summaries, batch_trace = run_profiled(traced, summarize_chunks, [r.chunk for r in requests],
+                                                          self.summarizer, default_max_length,
+                                                          batch_size=len(requests), sinks=sinks)
+                except Exception as e:
+                    for request in requests:
+                        request.future.set_exception(e)
+                    continue
+                self._report(requests, batch_trace)  # Before the callers wake up and close their spans
+                for request, summary in zip(requests, summaries):
+                    request.future.set_result(summary)
+
+    @staticmethod
+    def _report(requests, batch_trace):
+        """Add the batch's spans (generate calls) to the trace of every caller that is tracing."""
+        positions = {(id(r.trace_position[0]), id(r.trace_position[1])): r.trace_position
+                     for r in requests if r.trace_position is not None}
+        for position in positions.values():
+            graft(batch_trace, position)
@@ -0,0 +1,183 @@
+# Model profiles (quality / balanced / fast) picked per request to meet a latency target
+#
+# Each profile is a summarizer + topic model pair. Profiles load on first use, their
+# throughput is measured right after loading, and profiles that have had no jobs
+# for a while are evicted so only the ones serving traffic stay in memory.
+import functools
+import os
+import threading
+import time
+
+from inference_service import InferenceService
+from model_registry import evict, get_model
+from summarizer import chunk_text, generate_summary, load_pipeline
+from topic_modeler import get_sentence_model, initialize_topic_model, load_reference_model, sentence_model_name
+
+# From slowest/best to fastest. `words_per_second` is only a prior, used until the
+# profile (or any other profile, to scale it to this machine) has been measured.
+PROFILES = {
+    "quality": {
+        "summarizer": "sshleifer/distilbart-cnn-12-6",
+        "backend": "pytorch",
+        "max_chunk": 1024,
+        "embedding_model": "all-MiniLM-L6-v2",
+        "words_per_second": 60.0,
+    },
+    "balanced": {
+        "summarizer": "sshleifer/distilbart-cnn-12-6",
+        "backend": "int8",
+        "max_chunk": 1024,
+        "embedding_model": "all-MiniLM-L6-v2",
+        "words_per_second": 120.0,
+    },
+    "fast": {
+        "summarizer": "Falconsai/text_summarization",
+        "backend": "int8",
+        "max_chunk": 512,
+        "embedding_model": "paraphrase-albert-small-v2",
+        "words_per_second": 250.0,
+    },
+}
+
+DEFAULT_LATENCY_TARGET = 60.0  # Seconds
+IDLE_SECONDS = 15 * 60  # Profiles unused for this long are evicted
+
+_SAMPLE_TEXT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Sample_Text.txt")
+
+_throughput = {}  # profile -> measured words per second
+_last_used = {}   # profile -> time a job last started or finished on it (or it was loaded)
+_in_flight = {}   # profile -> jobs currently running on it
+_loaded = {}      # profile -> its models, once fully loaded
+_lock = threading.Lock()
+
+
+def _model_names(name):
+    """Registry names of everything a profile keeps loaded."""
+    profile = PROFILES[name]
+    return {
+        f"summarizer:{profile['summarizer']}:{profile['backend']}",
+        f"topic_model:{profile['embedding_model']}",
+        f"service:{name}",
+    }
+
+
+def load_profile(name, topic_model_path=None, threads=None):
+    """Load (once) and return a profile's models: service, chunker, topic_model, topic_mode, embedding_model.
+
+    topic_model_path: a reference model from fit_topic_model.py, used instead of the
+    profile's own topic model.
+    threads: CPU threads the profile's inference service generates with (the
+    summary stage's budget); the latest value applies to its next batch.
+    """
+    profile = PROFILES[name]
+    with _lock:
+        _last_used.setdefault(name, time.time())  # Loading alone does not count as use
+
+    summarizer = load_pipeline(profile["summarizer"], profile["backend"])
+    if name not in _throughput:
+        measure_throughput(name, summarizer)
+
+    service = get_model(f"service:{name}", lambda: InferenceService(summarizer, threads=threads))
+    if threads:
+        service.threads = threads
+
+    if topic_model_path:
+        topic_model, topic_mode = load_reference_model(topic_model_path)
+    else:
+        topic_model, topic_mode = initialize_topic_model(profile["embedding_model"]), "fit"
+    models = {
+        "name": name,
+        "service": service,
+        "chunker": functools.partial(chunk_text, max_chunk=profile["max_chunk"]),
+        "topic_model": topic_model,
+        "topic_mode": topic_mode,
+        "embedding_model": sentence_model_name(get_sentence_model(topic_model)),  # Names its corpus store
+    }
+    with _lock:
+        _loaded[name] = models
+    return models
+
+
+def loaded_models(name):
+    """A profile's models if they are loaded, else None; never loads anything."""
+    with _lock:
+        return _loaded.get(name)
+
+
+def acquire(name):
+    """Mark a job as running on a profile, so it is not evicted until release(name)."""
+    with _lock:
+        _in_flight[name] = _in_flight.get(name, 0) + 1
+        _last_used[name] = time.time()
+
+
+def release(name):
+    with _lock:
+        _in_flight[name] = max(0, _in_flight.get(name, 0) - 1)
+        _last_used[name] = time.time()
+
+
+def measure_throughput(name, summarizer, text=None):
+    """Time one summary of the sample text and record the profile's words per second."""
+    if text is None:
+        with open(_SAMPLE_TEXT, encoding="utf-8") as f:
+            text = f.read()
+    chunker = functools.partial(chunk_text, max_chunk=PROFILES[name]["max_chunk"])
+    # The first call pays for lazy initialization and cold caches; don't time it
+    generate_summary(" ".join(text.split()[:100]), summarizer, chunker=chunker)
+    start = time.perf_counter()
+    generate_summary(text, summarizer, chunker=chunker)
+    words_per_second = len(text.split()) / max(time.perf_counter() - start, 1e-6)
+    with _lock:
+        _throughput[name] = words_per_second
+    return words_per_second
+
+
+def throughput(name):
+    """Measured words per second, or the prior scaled by how fast this machine measured so far."""
+    with _lock:
+        if name in _throughput:
+            return _throughput[name]
+        factors = [measured / PROFILES[other]["words_per_second"] for other, measured in _throughput.items()]
+    factor = sum(factors) / len(factors) if factors else 1.0
+    return PROFILES[name]["words_per_second"] * factor
+
+
+def estimate_seconds(name, words):
+    return words / throughput(name)
+
+
+def choose_profile(words, latency_target=DEFAULT_LATENCY_TARGET):
+    """Best-quality profile expected to summarize `words` within the target (else the fastest)."""
+    for name in PROFILES:
+        if estimate_seconds(name, words) <= latency_target:
+            return name
+    return list(PROFILES)[-1]
+
+
+def evict_idle(idle_seconds=IDLE_SECONDS):
+    """Unload profiles with no running jobs and none started or finished for `idle_seconds`.
+
+    Models that remaining profiles share are kept. Returns the names of the evicted profiles.
+    """
+    now = time.time()
+    with _lock:
+        idle = {name for name, used in _last_used.items()
+                if now - used > idle_seconds and not _in_flight.get(name)}
+        active = [name for name in _last_used if name not in idle]
+        for name in idle:
+            del _last_used[name]
+            _loaded.pop(name, None)
+    keep = set().union(*(_model_names(name) for name in active))
+    for name in idle:
+        for model_name in _model_names(name) - keep:
+            model = evict(model_name)
+            if isinstance(model, InferenceService):
+                model.close()  # Finishes the queued chunks, then stops its worker
+    return sorted(idle)
+
+
+def loaded_profiles():
+    """Profiles whose models are currently in memory."""
+    with _lock:
+        return [name for name in PROFILES if name in _loaded]
@@ -0,0 +1,44 @@
+# Process-level registry so every model is loaded once per process, on first use
+import threading
+
+_models = {}  # name -> loaded model
+_locks = {}   # name -> lock held while that model loads
+_registry_lock = threading.Lock()
+
+
+def get_model(name, factory):
+    """Return the model registered as `name`, calling `factory()` to load it the first time.
+
+    Concurrent callers asking for the same model wait for a single load.
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        lock = _locks.setdefault(name, threading.Lock())
+    with lock:
+        if name not in _models:
+            _models[name] = factory()
+        return _models[name]
+
+
+def is_loaded(name):
+    return name in _models
+
+
+def evict(name):
+    """Forget a model so its memory can be reclaimed; it reloads on next use."""
+    with _registry_lock:
+        return _models.pop(name, None)
+
+
+def warm_up(*initializers):
+    """Call each model initializer in a background thread so the UI can render meanwhile."""
+    def run():
+        for initialize in initializers:
+            initialize()
+
+    thread = threading.Thread(target=run, name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -1,11 +1,145 @@
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
 import pdfplumber
 
-def extract_text_from_pdf(uploaded_file):
+from dedup import PAGE_BREAK
+from result_cache import make_key
+from tracing import span
+
+# Pages handed to a worker process at a time
+PAGES_PER_TASK = 8
+
+# Worker processes for parallel extraction: a few are enough to hide pdfplumber's
+# per-page cost without starving the models of cores
+PDF_WORKERS = min(4, os.cpu_count() or 1)
+
+_pool = None  # One pool per process, shared by every extraction
+_pool_lock = threading.Lock()
+
+
+def _shared_pool(workers):
+    """The process pool, created on first use with up to `workers` processes.
+
+    Workers are spawned rather than forked: forking a multithreaded server
+    (Streamlit, the inference service) can copy locks held by other threads.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=min(workers, PDF_WORKERS),
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _read_bytes(source):
+    """Read the raw PDF bytes from a path, an uploaded file or any file object"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read()
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    data = source.read()
+    source.seek(0)
+    return data
+
+
+def _extract_page_range(path, start, stop):
+    """Extract the text of pages [start, stop) in a worker process"""
+    with pdfplumber.open(path) as pdf:
+        return [pdf.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _extract_serially(path, tasks):
+    """Extract every task's pages from a single open document"""
+    with pdfplumber.open(path) as pdf:
+        for start, stop in tasks:
+            yield [pdf.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _page_count(source):
+    with pdfplumber.open(source) as pdf:
+        return len(pdf.pages)
+
+
+def iter_pdf_pages(source, page_range=None, workers=1, cache=None):
+    """Yield (page_number, text) for each page, in order, as soon as it is extracted.
+
+    page_range: optional (first, last) page numbers, 1-based and inclusive.
+    workers: with more than one, page ranges are extracted in parallel in the
+        shared worker pool (at most PDF_WORKERS processes) from a temporary copy
+        of the upload.
+    cache: optional ResultCache; page texts are keyed by the file hash.
+    """
+    data = _read_bytes(source)
+    digest = hashlib.sha256(data).hexdigest() if cache is not None else None
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(data)
+        path = tmp.name
+
+    try:
+        total = _page_count(path)
+        first, last = page_range or (1, total)
+        start, stop = max(first, 1) - 1, min(last, total)
+
+        # Serve cached pages first and only extract the rest
+        cached = {}
+        if cache is not None:
+            for i in range(start, stop):
+                page_text = cache.get(make_key("pdf-page", digest, i))
+                if page_text is not None:
+                    cached[i] = page_text
+
+        # Split the missing pages into small tasks so results stream back in order
+        missing = [i for i in range(start, stop) if i not in cached]
+        tasks = []
+        for i in missing:
+            if tasks and tasks[-1][1] == i and tasks[-1][1] - tasks[-1][0] < PAGES_PER_TASK:
+                tasks[-1][1] = i + 1
+            else:
+                tasks.append([i, i + 1])
+
+        futures = []
+        if min(workers, PDF_WORKERS) > 1 and len(tasks) > 1:
+            pool = _shared_pool(workers)
+            futures = [pool.submit(_extract_page_range, path, task_start, task_stop)
+                       for task_start, task_stop in tasks]
+            results = (future.result() for future in futures)
+        else:
+            results = _extract_serially(path, tasks)
+
+        try:
+            next_page = start
+            for (task_start, _), texts in zip(tasks, results):
+                # Emit cached pages that come before this task
+                while next_page < task_start:
+                    yield next_page + 1, cached[next_page]
+                    next_page += 1
+                for i, page_text in enumerate(texts, task_start):
+                    if cache is not None:
+                        cache.put(make_key("pdf-page", digest, i), page_text)
+                    yield i + 1, page_text
+                next_page = task_start + len(texts)
+            while next_page < stop:
+                yield next_page + 1, cached[next_page]
+                next_page += 1
+        finally:
+            for future in futures:
+                future.cancel()  # Stop queued tasks if the caller stopped reading early
+    finally:
+        os.remove(path)
+
+
+def extract_text_from_pdf(uploaded_file, page_range=None, workers=1, cache=None):
     """Extracts text from PDF using pdfplumber (faster and cleaner than PyPDF2)"""
-    text = ""
-    with pdfplumber.open(uploaded_file) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-    return text
+    with span("extract_text_from_pdf", workers=workers) as s:
+        pages = list(iter_pdf_pages(uploaded_file, page_range, workers, cache))
+        parts = [page_text + "\n" for _, page_text in pages if page_text]
+        text = PAGE_BREAK.join(parts)  # Page breaks let preprocess() spot repeated headers and footers
+        s.set(pages=len(pages), chars=len(text))
+        return text
@@ -0,0 +1,150 @@
+# Run the independent pipeline stages (summary, topics) at the same time
+import contextvars
+import inspect
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from tracing import run_profiled
+
+
+def default_thread_budgets(stages=("summary", "topics")):
+    """Split the machine's cores evenly between the stages."""
+    cores = os.cpu_count() or 1
+    return {stage: max(1, cores // len(stages)) for stage in stages}
+
+
+def set_thread_budget(threads):
+    """Limit the native thread pools used by the current worker.
+
+    torch (OpenMP) and numba both take the limit per calling thread, so in
+    thread mode each stage worker gets its own budget. Process mode gives
+    each stage a fully separate runtime.
+    """
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    try:
+        import numba
+        numba.set_num_threads(min(threads, numba.config.NUMBA_NUM_THREADS))
+    except ImportError:
+        pass
+
+
+class PipelineExecutor:
+    """One single-worker pool per stage, each with its own thread budget."""
+
+    def __init__(self, thread_budgets=None, mode="thread"):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.mode = mode
+        self.thread_budgets = thread_budgets or default_thread_budgets()
+        pool_class = ThreadPoolExecutor if mode == "thread" else ProcessPoolExecutor
+        self._pools = {
+            stage: pool_class(max_workers=1, initializer=set_thread_budget, initargs=(threads,))
+            for stage, threads in self.thread_budgets.items()
+        }
+
+    def submit(self, stage, fn, *args, **kwargs):
+        if self.mode == "thread":
+            # Carry the caller's context (an active trace or profile) into the worker thread
+            return self._pools[stage].submit(contextvars.copy_context().run, run_profiled, fn, *args, **kwargs)
+        return self._pools[stage].submit(fn, *args, **kwargs)
+
+    def start(self, tasks):
+        """Start `{stage: (fn, args, kwargs)}` in the background and return a Job to poll.
+
+        In thread mode a stage function may return a generator; every value it
+        yields becomes the stage's latest result, so callers can show partial output.
+        """
+        job = Job(tasks)
+        for stage, (fn, args, kwargs) in tasks.items():
+            if self.mode == "thread":
+                future = self.submit(stage, _drain, job, stage, fn, *args, **kwargs)
+            else:
+                future = self.submit(stage, fn, *args, **kwargs)
+                future.add_done_callback(lambda f, stage=stage: job._update(stage, f.result()))
+            future.add_done_callback(lambda f, stage=stage: job._finish(stage, f.exception()))
+        return job
+
+    def shutdown(self, wait=True):
+        for pool in self._pools.values():
+            pool.shutdown(wait=wait)
+
+
+class Job:
+    """Stages running in the background, with the latest result of each.
+
+    The job outlives the code that started it, so a Streamlit rerun can pick
+    it up from session state and keep showing its progress.
+    """
+
+    def __init__(self, tasks):
+        self.stages = list(tasks)
+        self.started = time.time()
+        self.finished_at = None
+        self._results = {}
+        self._errors = {}
+        self._finished = set()
+        self._callbacks = []
+        self._changed = threading.Condition()
+
+    def _update(self, stage, result):
+        with self._changed:
+            self._results[stage] = result
+            self._changed.notify_all()
+
+    def _finish(self, stage, error=None):
+        with self._changed:
+            if error is not None:
+                self._errors[stage] = error
+            self._finished.add(stage)
+            callbacks = []
+            if self.done:
+                self.finished_at = time.time()
+                callbacks, self._callbacks = self._callbacks, []
+            self._changed.notify_all()
+        for callback in callbacks:
+            callback(self)
+
+    def add_done_callback(self, fn):
+        """Call `fn(job)` once every stage has finished (straight away if it already has)."""
+        with self._changed:
+            if not self.done:
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    @property
+    def done(self):
+        return len(self._finished) == len(self.stages)
+
+    @property
+    def seconds(self):
+        return (self.finished_at or time.time()) - self.started
+
+    def snapshot(self):
+        """`{stage: (latest result or None, finished, error or None)}`"""
+        with self._changed:
+            return {stage: (self._results.get(stage), stage in self._finished, self._errors.get(stage))
+                    for stage in self.stages}
+
+    def wait(self, timeout=None):
+        """Block until any stage reports something new (or the job is done); True if done."""
+        with self._changed:
+            if not self.done:
+                self._changed.wait(timeout)
+            return self.done
+
+
+def _drain(job, stage, fn, *args, **kwargs):
+    """Run one stage, recording each partial result if it is a generator."""
+    result = fn(*args, **kwargs)
+    if inspect.isgenerator(result):
+        for partial in result:
+            job._update(stage, partial)
+    else:
+        job._update(stage, result)
@@ -0,0 +1,166 @@
+# Single-pass document preprocessing shared by the summarizer and the topic modeler
+#
+# preprocess(text) normalizes the text once, splits it into sentences with an
+# abbreviation-aware segmenter and records each sentence's offsets and word count.
+# Both stages read the resulting Document instead of re-splitting the raw text.
+import re
+import unicodedata
+from array import array
+
+from dedup import PAGE_BREAK, near_duplicates, strip_repeated_lines
+from tracing import span
+
+# Abbreviations that are never the end of a sentence
+_ABBREVIATIONS = {
+    "e.g", "i.e", "cf", "vs", "viz", "approx", "ca", "al", "fig", "figs", "eq", "eqs",
+    "vol", "pp", "ch", "dept", "mr", "mrs", "ms", "dr", "prof",
+    "st", "mt", "sr", "jr", "lt", "capt", "rev", "resp",
+}
+
+# Abbreviations that often end a sentence ("It took 5 min. Then", "until Dec. The"):
+# split only before a capitalized word
+_FINAL_ABBREVIATIONS = {
+    "etc", "inc", "ltd", "co", "corp", "bros", "min", "max", "sec", "est", "gen", "col",
+    "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+}
+
+# Ordinary words that are only abbreviations before a number ("No. 5", but "He said no.")
+_NUMBER_ABBREVIATIONS = {"no", "nos"}
+
+# Dotted acronyms of single letters ("u.s", "p.m"; not "example.com")
+_ACRONYM = re.compile(r'(?:[a-z]\.)+[a-z]')
+
+# Sentence-ending punctuation (plus closing quotes/brackets) followed by a space
+_CANDIDATE_END = re.compile(r'[.!?]+["\'”’)\]]*(?= )')
+
+# Words split across a line break by hyphenation in PDFs
+_LINE_HYPHEN = re.compile(r'(\w)-\n\s*(\w)')
+
+
+def normalize(text):
+    """Unicode-normalize, rejoin hyphenated line breaks and collapse whitespace."""
+    text = unicodedata.normalize("NFKC", text).replace("\u00ad", "")  # Soft hyphens
+    text = _LINE_HYPHEN.sub(r'\1\2', text)
+    return " ".join(text.split())
+
+
+def _is_sentence_end(text, match):
+    """Decide whether a candidate end of sentence in normalized text is a real one."""
+    end = match.end()
+    if end + 1 >= len(text):
+        return True
+    next_char = text[end + 1]
+    punctuation = match.group()
+    if "!" in punctuation or "?" in punctuation:
+        # A quoted exclamation or question followed by lowercase continues ('"Yes!" he said')
+        return not (punctuation[-1] in "\"'”’" and next_char.islower())
+
+    # The word the full stop is attached to
+    word = text[text.rfind(" ", 0, match.start()) + 1:match.start()].lstrip("\"'(“‘[").lower()
+    if word in _ABBREVIATIONS:
+        return False
+    # Initials and dotted acronyms ("J. Smith", "U.S. policy")
+    if (len(word) == 1 and word.isalpha()) or _ACRONYM.fullmatch(word):
+        return False
+    if word in _FINAL_ABBREVIATIONS:
+        return next_char.isupper()
+    if word in _NUMBER_ABBREVIATIONS:
+        return not next_char.isdigit()
+    # "approx. five", "3 p.m. and": a lowercase word continues the sentence
+    return not next_char.islower()
+
+
+def segment(text):
+    """Return (start, end) offsets of the sentences in normalized text."""
+    spans = []
+    start = 0
+    for match in _CANDIDATE_END.finditer(text):
+        if _is_sentence_end(text, match):
+            spans.append((start, match.end()))
+            start = match.end() + 1
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+
+class Document:
+    """Normalized text plus sentence offsets and word counts, built once per document.
+
+    Sentence strings and per-tokenizer token counts are computed on first use
+    and kept, so each stage only pays for what it reads. `dropped` counts the
+    characters removed as boilerplate or duplicates, by kind.
+    """
+
+    __slots__ = ("text", "starts", "ends", "word_counts", "dropped", "_sentences", "_token_counts")
+
+    def __init__(self, text, spans):
+        self.text = text
+        self.starts = array("l", (s for s, _ in spans))
+        self.ends = array("l", (e for _, e in spans))
+        self.word_counts = array("l", (text.count(" ", s, e) + 1 for s, e in spans))
+        self.dropped = {}
+        self._sentences = None
+        self._token_counts = {}
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def sentences(self):
+        if self._sentences is None:
+            self._sentences = [self.text[s:e] for s, e in zip(self.starts, self.ends)]
+        return self._sentences
+
+    @property
+    def words(self):
+        return sum(self.word_counts)
+
+    def token_counts(self, tokenizer):
+        """Token count of every sentence, tokenized in one call and cached per tokenizer."""
+        name = getattr(tokenizer, "name_or_path", None) or id(tokenizer)
+        counts = self._token_counts.get(name)
+        if counts is None:
+            ids = tokenizer(self.sentences, add_special_tokens=False)["input_ids"] if len(self) else []
+            counts = self._token_counts[name] = array("l", map(len, ids))
+        return counts
+
+    def select(self, indices):
+        """New Document holding only the sentences at `indices`, joined in that order."""
+        sentences = [self.sentences[i] for i in indices]
+        spans, position = [], 0
+        for sentence in sentences:
+            spans.append((position, position + len(sentence)))
+            position += len(sentence) + 1
+        doc = Document(" ".join(sentences), spans)
+        doc.dropped = dict(self.dropped)
+        for name, counts in self._token_counts.items():
+            doc._token_counts[name] = array("l", (counts[i] for i in indices))
+        return doc
+
+
+def preprocess(text, dedup=False):
+    """Build a Document from raw text (a Document is returned unchanged).
+
+    dedup: drop lines repeated across pages (headers, footers, page numbers)
+    and sentences that repeat an earlier one, recording the dropped characters.
+    """
+    if isinstance(text, Document):
+        return text
+    with span("preprocess", chars=len(text), dedup=dedup) as s:
+        dropped = {}
+        if dedup:
+            pages, dropped["boilerplate"] = strip_repeated_lines(text.split(PAGE_BREAK))
+            text = "\n".join(pages)
+
+        normalized = normalize(text)
+        doc = Document(normalized, segment(normalized))
+
+        if dedup:
+            duplicates = set(near_duplicates(doc.sentences))
+            dropped["duplicates"] = sum(doc.ends[i] - doc.starts[i] for i in duplicates)
+            if duplicates:
+                doc = doc.select([i for i in range(len(doc)) if i not in duplicates])
+            doc.dropped = dropped
+            s.set(**{f"dropped_{kind}_chars": chars for kind, chars in dropped.items()})
+        s.set(sentences=len(doc))
+        return doc
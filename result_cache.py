@@ -0,0 +1,129 @@
+# Content-addressed cache for summaries and topic extraction results
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so re-extracted copies of a document hash the same."""
+    return " ".join(text.split())
+
+
+def make_key(*parts) -> str:
+    """Hash any JSON-serialisable parts (text, model name, parameters) into a cache key."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Two-tier cache: an in-memory LRU in front of an optional SQLite file.
+
+    Values are stored as compressed JSON. Both tiers evict their least
+    recently used entries once they grow past their size limit.
+    """
+
+    def __init__(self, max_memory_bytes=64 * 1024 * 1024, disk_path=None,
+                 max_disk_bytes=1024 * 1024 * 1024):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()  # key -> compressed value, oldest first
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        # Optional on-disk tier shared between app restarts
+        self._db = None
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value BLOB, size INTEGER, accessed REAL)"
+            )
+            self._db.commit()
+
+    def get(self, key, default=None):
+        with self._lock:
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return json.loads(zlib.decompress(blob))
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    self._store_in_memory(key, row[0])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return json.loads(zlib.decompress(row[0]))
+
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            self._store_in_memory(key, blob)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                    (key, blob, len(blob), time.time())
+                )
+                self._evict_disk()
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
+            if self._db is not None:
+                count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+                stats["disk_entries"] = count
+                stats["disk_bytes"] = size
+            return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def _store_in_memory(self, key, blob):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = blob
+        self._memory_bytes += len(blob)
+
+        # Drop least recently used entries until we are back under the limit
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _evict_disk(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM results ORDER BY accessed").fetchall()
+        for key, size in rows:
+            if total <= self.max_disk_bytes:
+                break
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
@@ -1,41 +1,436 @@
-# Import the Hugging Face summarization pipeline
-from transformers import pipeline
+import hashlib
+import os
+import re
+import shutil
+import time
+
+from extractive import select_sentences
+from model_registry import get_model
+from preprocess import preprocess
+from result_cache import make_key
+from tracing import span
+
+# Tokens left free in each chunk for the special tokens the pipeline adds
+_SPECIAL_TOKEN_MARGIN = 16
+
+# Content-defined chunk boundaries: once a chunk holds this share of its token budget,
+# it ends after the next sentence whose hash is a multiple of _CUT_MODULUS
+_CUT_MIN_FILL = 0.6
+_CUT_MODULUS = 4
+
+# Inference backends: plain fp32 PyTorch, dynamic int8 quantization, or ONNX Runtime
+BACKENDS = ("pytorch", "int8", "onnx")
+
+# Converted models are kept here so conversion only happens once
+MODEL_CACHE_DIR = os.path.join(".cache", "models")
+
+
+# Load a summarization pipeline once per process (transformers is imported on first use)
+def load_pipeline(model_name, backend=None):
+    # The backend can be picked per deployment with the SUMMARIZER_BACKEND variable
+    backend = backend or os.environ.get("SUMMARIZER_BACKEND", "pytorch")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown summarizer backend {backend!r}, expected one of {BACKENDS}")
+
+    def build():
+        # Import the Hugging Face summarization pipeline
+        from transformers import pipeline
+        if backend == "int8":
+            summarizer = _load_int8_pipeline(model_name)
+        elif backend == "onnx":
+            summarizer = _load_onnx_pipeline(model_name)
+        else:
+            summarizer = pipeline("summarization", model=model_name)
+        # Quantized and exported models keep the original name, so tag the backend for cache keys
+        summarizer.cache_tag = f"{model_name}:{backend}"
+        return summarizer
+    return get_model(f"summarizer:{model_name}:{backend}", build)
+
+
+# Versions of the libraries a converted model depends on (pickled modules only load in the same ones)
+def _library_versions(*packages):
+    from importlib.metadata import PackageNotFoundError, version
+    versions = []
+    for package in packages:
+        try:
+            versions.append(f"{package}{version(package)}")
+        except PackageNotFoundError:
+            versions.append(f"{package}-none")
+    return "-".join(versions)
+
+
+# Folder name for a converted copy of a model
+def _converted_path(model_name, backend, packages=("torch", "transformers")):
+    name = f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)}-{backend}-{_library_versions(*packages)}"
+    return os.path.join(MODEL_CACHE_DIR, re.sub(r'[^A-Za-z0-9_.-]+', '_', name))
+
+
+# Temporary name next to `path`, unique per process, for writing before an atomic rename
+def _temporary_path(path):
+    return f"{path}.tmp-{os.getpid()}"
+
+
+# fp32 model with its Linear layers quantized to int8 (weights) on the fly
+def _load_int8_pipeline(model_name):
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    path = os.path.join(_converted_path(model_name, "int8"), "model.pt")
+    if os.path.exists(path):
+        # Quantized modules can't be rebuilt from a state dict alone, so the whole module is pickled
+        model = torch.load(path, weights_only=False)
+    else:
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so concurrent workers and interrupted saves never leave a partial file
+        tmp = _temporary_path(path)
+        torch.save(model, tmp)
+        os.replace(tmp, path)
+    model.eval()
+    return pipeline("summarization", model=model, tokenizer=tokenizer)
+
+
+# Model exported to ONNX and run with ONNX Runtime (needs the optional `optimum[onnxruntime]` package)
+def _load_onnx_pipeline(model_name):
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        from optimum.pipelines import pipeline
+    except ImportError as e:
+        raise ImportError("The onnx backend needs `pip install optimum[onnxruntime]`") from e
+    from transformers import AutoTokenizer
+
+    path = _converted_path(model_name, "onnx", ("transformers", "optimum", "onnxruntime"))
+    marker = os.path.join(path, ".complete")  # Written last, so an interrupted export is redone
+    if os.path.exists(marker):
+        model = ORTModelForSeq2SeqLM.from_pretrained(path)
+        tokenizer = AutoTokenizer.from_pretrained(path)
+    else:
+        model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        tmp = _temporary_path(path)
+        shutil.rmtree(tmp, ignore_errors=True)
+        model.save_pretrained(tmp)
+        tokenizer.save_pretrained(tmp)
+        open(os.path.join(tmp, ".complete"), "w").close()
+        if not os.path.exists(marker):
+            shutil.rmtree(path, ignore_errors=True)  # Leftovers of an interrupted export
+            try:
+                os.replace(tmp, path)
+            except OSError:
+                pass  # Another worker finished its export first; keep that one
+        shutil.rmtree(tmp, ignore_errors=True)
+    return pipeline("summarization", model=model, tokenizer=tokenizer, accelerator="ort")
+
 
 # Initialize the summarizer pipeline using a pre-trained DistilBART model
-def initialize_summarizer():
-    return pipeline("summarization", model="sshleifer/distilbart-cnn-12-6")
+def initialize_summarizer(backend=None):
+    return load_pipeline("sshleifer/distilbart-cnn-12-6", backend)
+
+
+# Name of the model (and backend) behind a pipeline, used in cache keys
+def _model_name(summarizer):
+    tag = getattr(summarizer, "cache_tag", None)
+    if tag:
+        return tag
+    model = getattr(summarizer, "model", None)
+    return getattr(model, "name_or_path", None) or type(summarizer).__name__
+
+
+# Count the tokens in a piece of text (falls back to words without a tokenizer)
+def count_tokens(text, tokenizer=None):
+    if tokenizer is None:
+        return len(text.split())
+    return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+
+# Number of tokens a chunk may hold for this tokenizer
+def _token_budget(max_chunk, tokenizer):
+    model_max_length = getattr(tokenizer, "model_max_length", max_chunk) or max_chunk
+    return max(1, min(max_chunk, model_max_length) - _SPECIAL_TOKEN_MARGIN)
+
+
+# Whether a chunk may end after this sentence (depends only on its text, so an edit
+# elsewhere in the document does not move the boundary)
+def _is_cut_point(sentence):
+    digest = hashlib.blake2b(sentence.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "little") % _CUT_MODULUS == 0
 
 
 # Split long text into manageable chunks for the summarizer
-def chunk_text(text, max_chunk=1024):
-    # Slices the text into pieces of `max_chunk` characters
-    return [text[i:i+max_chunk] for i in range(0, len(text), max_chunk)]
+def chunk_text(text, max_chunk=1024, tokenizer=None, overlap=0):
+    if tokenizer is None:
+        # Without a tokenizer, slice the text into pieces of `max_chunk` characters
+        text = getattr(text, "text", text)
+        return [text[i:i+max_chunk] for i in range(0, len(text), max_chunk)]
 
+    # With a tokenizer, `max_chunk` and `overlap` are measured in tokens
+    budget = _token_budget(max_chunk, tokenizer)
+    doc = preprocess(text)
+    if not len(doc):
+        return []
 
-# Generate a summary from long input text using the summarizer pipeline
-def generate_summary(text, summarizer, default_max_length=150):
-    chunks = chunk_text(text)  # Break the text into smaller parts
-    summaries = []  # Store summaries for each chunk
+    # Token counts of every sentence (tokenized once per document and tokenizer)
+    lengths = doc.token_counts(tokenizer)
 
-    for chunk in chunks:
-        # Estimate the number of words in the chunk
-        input_length = len(chunk.split())
+    # Sentences longer than the budget are cut into token slices
+    pieces = []
+    for sentence, length in zip(doc.sentences, lengths):
+        if length <= budget:
+            pieces.append((sentence, length))
+            continue
+        ids = tokenizer(sentence, add_special_tokens=False)["input_ids"]
+        for i in range(0, len(ids), budget):
+            part = ids[i:i+budget]
+            pieces.append((tokenizer.decode(part, skip_special_tokens=True), len(part)))
 
-        # Dynamically set the max summary length to 80% of input, capped at default
-        effective_max_length = min(default_max_length, int(input_length * 0.8))
+    # Pack whole sentences into chunks up to the token budget. Past the minimum fill a
+    # chunk ends at a content-defined cut point, so after an edit the later chunks line
+    # up again with the old ones and their cached summaries are reused.
+    min_fill = _CUT_MIN_FILL * budget
+    chunks = []
+    current, current_length = [], 0
+    for i, (piece, length) in enumerate(pieces):
+        current.append((piece, length))
+        current_length += length
 
-        try:
-            # Generate the summary using the transformer pipeline
-            summary = summarizer(
+        next_length = pieces[i + 1][1] if i + 1 < len(pieces) else 0
+        full = current_length + next_length > budget
+        if i + 1 == len(pieces) or not (full or (current_length >= min_fill and _is_cut_point(piece))):
+            continue
+        chunks.append(" ".join(p for p, _ in current))
+
+        # Carry the last few sentences into the next chunk as overlap
+        carried, carried_length = [], 0
+        for p, l in reversed(current):
+            if carried_length + l > overlap:
+                break
+            carried.insert(0, (p, l))
+            carried_length += l
+        if carried_length + next_length > budget:
+            carried, carried_length = [], 0
+        current, current_length = carried, carried_length
+
+    if current:
+        chunks.append(" ".join(p for p, _ in current))
+    return chunks
+
+
+# Run the chunker inside a tracing span
+def _chunk(chunker, text, tokenizer, overlap):
+    with span("chunk_text", chars=len(getattr(text, "text", text))) as s:
+        chunks = chunker(text, tokenizer=tokenizer, overlap=overlap)
+        s.set(chunks=len(chunks))
+        return chunks
+
+
+# Work out the summary length limits for an input of `input_length` tokens
+def length_limits(input_length, default_max_length):
+    # Dynamically set the max summary length to 80% of input, capped at default
+    max_length = max(1, min(default_max_length, int(input_length * 0.8)))
+
+    # Ask for at least 30 tokens, but never more than half the cap
+    min_length = min(30, max_length // 2)
+    return max_length, min_length
+
+
+# Summarize a single chunk, returning an error marker instead of raising
+def _summarize_chunk(chunk, input_length, summarizer, default_max_length):
+    max_length, min_length = length_limits(input_length, default_max_length)
+    try:
+        # Generate the summary using the transformer pipeline
+        with span("generate", chunks=1, tokens=input_length):
+            return summarizer(
                 chunk,
-                max_length=effective_max_length,  # Cap summary length
-                min_length=30,                    # Ensure a minimum summary size
-                do_sample=False                   # Use greedy decoding for deterministic output
+                max_length=max_length,            # Cap summary length
+                min_length=min_length,            # Ensure a minimum summary size
+                do_sample=False,                  # Use greedy decoding for deterministic output
+                truncation=True                   # Never overrun the model's context window
             )[0]['summary_text']
-            summaries.append(summary)  # Add the summary of the chunk
-        except Exception as e:
-            # If something goes wrong, store the error message in the output
-            summaries.append(f"[Summarization failed: {e}]")
+    except Exception as e:
+        # If something goes wrong, store the error message in the output
+        return f"[Summarization failed: {e}]"
+
+
+# Summarize a list of chunks in padded batches, keeping the original order
+def summarize_chunks(chunks, summarizer, default_max_length=150, batch_size=8, cache=None):
+    if cache is not None:
+        # Look every chunk up first and only summarize the ones we have not seen
+        with span("cache_lookup", chunks=len(chunks)) as lookup:
+            model_name = _model_name(summarizer)
+            keys = [make_key("summary-chunk", model_name, chunk, default_max_length) for chunk in chunks]
+            summaries = [cache.get(key) for key in keys]
+            missing = [i for i, summary in enumerate(summaries) if summary is None]
+            lookup.set(hits=len(chunks) - len(missing))
+        fresh = summarize_chunks([chunks[i] for i in missing], summarizer, default_max_length, batch_size)
+        for i, summary in zip(missing, fresh):
+            summaries[i] = summary
+            if not summary.startswith("[Summarization failed"):
+                cache.put(keys[i], summary)
+        return summaries
+
+    # A shared inference service batches chunks across concurrent requests itself
+    if hasattr(summarizer, "summarize_chunks"):
+        return summarizer.summarize_chunks(chunks, default_max_length)
+
+    summaries = [None] * len(chunks)
+    if not chunks:
+        return summaries
+
+    # Measure each chunk in real tokens when the pipeline has a tokenizer
+    tokenizer = getattr(summarizer, "tokenizer", None)
+    if tokenizer is not None:
+        lengths = [len(ids) for ids in tokenizer(chunks, add_special_tokens=False)["input_ids"]]
+    else:
+        lengths = [count_tokens(chunk) for chunk in chunks]
+
+    # Only chunks with the same length limits share a batch (full-size chunks all hit the
+    # cap; a short tail chunk gets its own call), sorted by length so batches pad little
+    groups = {}
+    for i in sorted(range(len(chunks)), key=lambda i: lengths[i]):
+        groups.setdefault(length_limits(lengths[i], default_max_length), []).append(i)
+    batches = [(limits, group[start:start + batch_size]) for limits, group in groups.items()
+               for start in range(0, len(group), batch_size)]
+
+    for (max_length, min_length), batch in batches:
+        if len(batch) == 1:
+            i = batch[0]
+            summaries[i] = _summarize_chunk(chunks[i], lengths[i], summarizer, default_max_length)
+            continue
+
+        try:
+            # One generate pass for the whole batch
+            with span("generate", chunks=len(batch), tokens=sum(lengths[i] for i in batch)):
+                outputs = summarizer(
+                    [chunks[i] for i in batch],
+                    max_length=max_length,
+                    min_length=min_length,
+                    do_sample=False,
+                    truncation=True,
+                    batch_size=len(batch)
+                )
+            for i, output in zip(batch, outputs):
+                summaries[i] = output['summary_text']
+        except Exception:
+            # Retry the batch one chunk at a time so a bad chunk only fails itself
+            for i in batch:
+                summaries[i] = _summarize_chunk(chunks[i], lengths[i], summarizer, default_max_length)
+
+    return summaries
+
+
+# Summarize, then re-summarize the joined summaries until they fit `target_length` tokens
+def map_reduce_summary(text, summarizer, target_length=300, default_max_length=150,
+                       batch_size=8, overlap=0, max_levels=5, chunker=chunk_text, cache=None):
+    tokenizer = getattr(summarizer, "tokenizer", None)
+    doc = preprocess(text)
+    chunks = _chunk(chunker, doc, tokenizer, overlap)
+    input_tokens = sum(doc.token_counts(tokenizer)) if tokenizer is not None else doc.words
+    levels = []  # Timing and size report for each level
+    current = ""
+    max_length = default_max_length
+
+    for level in range(max_levels):
+        start_time = time.perf_counter()
 
-    # Join all chunk summaries into a single string
-    return " ".join(summaries)
+        # Map: summarize every chunk of this level
+        with span("summary_level", level=level, chunks=len(chunks), tokens=input_tokens):
+            summaries = summarize_chunks(chunks, summarizer, max_length, batch_size, cache)
+
+        # Only the joined text of the current level is kept for the next one
+        current = " ".join(summaries)
+        output_tokens = count_tokens(current, tokenizer)
+        levels.append({
+            "level": level,
+            "chunks": len(chunks),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "seconds": time.perf_counter() - start_time,
+        })
+
+        # Stop once the result fits, or when another level would not shrink it
+        if output_tokens <= target_length or output_tokens >= input_tokens or len(chunks) == 1:
+            break
+
+        # Reduce: regroup the summaries into chunks for the next level
+        chunks = _chunk(chunker, current, tokenizer, overlap)
+        input_tokens = output_tokens
+
+        # The final single-chunk pass is capped at the target length
+        if len(chunks) == 1:
+            max_length = min(default_max_length, target_length)
+
+    return current, levels
+
+
+# Summarize long input text, yielding a progress update after every batch of chunks
+def iter_summary(text, summarizer, default_max_length=150, batch_size=8, overlap=0,
+                 target_length=None, cache=None, chunker=chunk_text,
+                 extractive_ratio=None, sentence_model=None, embedding_store=None):
+    if extractive_ratio is not None and sentence_model is None:
+        raise ValueError("extractive_ratio needs a sentence_model (or topic model) to embed the sentences")
+
+    # Each update: the summary so far, the chunk summaries just finished and the fraction done
+    def update(summary, new, done_chunks, total_chunks):
+        return {"summary": summary, "new": new, "chunks_done": done_chunks, "chunks": total_chunks,
+                "progress": done_chunks / total_chunks if total_chunks else 1.0,
+                "done": done_chunks == total_chunks}
+
+    # Normalize and split the text once; chunking reads the sentences from this document
+    doc = preprocess(text)
+    with span("generate_summary", chars=len(doc.text)) as s:
+        key = None
+        if cache is not None:
+            # Whole-document hit: the same text was summarized with the same settings before
+            key = make_key("summary", _model_name(summarizer), doc.text,
+                           default_max_length, overlap, target_length, extractive_ratio)
+            summary = cache.get(key)
+            if summary is not None:
+                s.set(cache="hit")
+                yield update(summary, [summary], 1, 1)
+                return
+
+        # Only the most central sentences go through the (expensive) abstractive model
+        if extractive_ratio is not None:
+            doc = select_sentences(doc, sentence_model, extractive_ratio, embedding_store=embedding_store)
+
+        # With a target length, condense the chunk summaries level by level
+        # (the levels depend on each other, so only the final result is reported)
+        if target_length is not None:
+            summary, levels = map_reduce_summary(doc, summarizer, target_length, default_max_length,
+                                                 batch_size, overlap, chunker=chunker, cache=cache)
+            s.set(levels=len(levels))
+            final = update(summary, [summary], 1, 1)
+        else:
+            # Break the text into sentence-aligned chunks that fill the model's context window
+            chunks = _chunk(chunker, doc, getattr(summarizer, "tokenizer", None), overlap)
+            s.set(chunks=len(chunks))
+
+            # Summarize the chunks in document order, one batch at a time (batch_size=1 runs
+            # them one by one); with a cache, only chunks that changed since last time reach the model
+            summaries = []
+            final = update("", [], 0, len(chunks))
+            for start in range(0, len(chunks), batch_size):
+                new = summarize_chunks(chunks[start:start + batch_size], summarizer,
+                                       default_max_length, batch_size, cache)
+                summaries.extend(new)
+
+                # Join all chunk summaries so far into a single string
+                final = update(" ".join(summaries), new, len(summaries), len(chunks))
+                if not final["done"]:
+                    yield final
+
+        if key is not None and "[Summarization failed" not in final["summary"]:
+            cache.put(key, final["summary"])
+        yield final
+
+
+# Generate a summary from long input text using the summarizer pipeline
+def generate_summary(text, summarizer, default_max_length=150, batch_size=8, overlap=0,
+                     target_length=None, cache=None, chunker=chunk_text,
+                     extractive_ratio=None, sentence_model=None, embedding_store=None):
+    for update in iter_summary(text, summarizer, default_max_length, batch_size, overlap, target_length,
+                               cache, chunker, extractive_ratio, sentence_model, embedding_store):
+        pass
+    return update["summary"]
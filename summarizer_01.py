@@ -1,29 +1,33 @@
-from transformers import pipeline
+from summarizer import (
+    chunk_text as _chunk_text,
+    generate_summary as _generate_summary,
+    iter_summary as _iter_summary,
+    load_pipeline,
+    map_reduce_summary as _map_reduce_summary,
+)
 
-def initialize_summarizer():
-    return pipeline("summarization", model="Falconsai/text_summarization")  # Light and fast
+def initialize_summarizer(backend=None):
+    return load_pipeline("Falconsai/text_summarization", backend)  # Light and fast
 
-def chunk_text(text, max_chunk=512):
-    return [text[i:i + max_chunk] for i in range(0, len(text), max_chunk)]
+def chunk_text(text, max_chunk=512, tokenizer=None, overlap=0):
+    # T5 takes 512 tokens, so chunks are half the size of the DistilBART ones
+    return _chunk_text(text, max_chunk, tokenizer, overlap)
 
-def generate_summary(text, summarizer, default_max_length=150):
-    chunks = chunk_text(text)
-    summaries = []
+def map_reduce_summary(text, summarizer, target_length=300, default_max_length=150,
+                       batch_size=8, overlap=0, max_levels=5, cache=None):
+    return _map_reduce_summary(text, summarizer, target_length, default_max_length,
+                               batch_size, overlap, max_levels, chunker=chunk_text, cache=cache)
 
-    for chunk in chunks:
-        input_length = len(chunk.split())  # Approximate token length using words
-        effective_max_length = min(default_max_length, int(input_length * 0.8))
-
-        try:
-            summary = summarizer(
-                chunk,
-                max_length=effective_max_length,
-                min_length=30,
-                do_sample=False
-            )[0]['summary_text']
-            summaries.append(summary)
-        except Exception as e:
-            summaries.append(f"[Summarization failed: {e}]")
-
-    return " ".join(summaries)
+def generate_summary(text, summarizer, default_max_length=150, batch_size=8, overlap=0,
+                     target_length=None, cache=None, extractive_ratio=None, sentence_model=None,
+                     embedding_store=None):
+    # Batching, map-reduce, caching and extractive pre-selection are shared with the DistilBART summarizer
+    return _generate_summary(text, summarizer, default_max_length, batch_size, overlap,
+                             target_length, cache, chunker=chunk_text, extractive_ratio=extractive_ratio,
+                             sentence_model=sentence_model, embedding_store=embedding_store)
 
+def iter_summary(text, summarizer, default_max_length=150, batch_size=8, overlap=0,
+                 target_length=None, cache=None, extractive_ratio=None, sentence_model=None,
+                 embedding_store=None):
+    return _iter_summary(text, summarizer, default_max_length, batch_size, overlap,
+                         target_length, cache, chunk_text, extractive_ratio, sentence_model, embedding_store)
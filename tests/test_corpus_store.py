@@ -0,0 +1,88 @@
+import atexit
+
+import numpy as np
+import pytest
+
+import corpus_store
+from benchmarks.stubs import StubSentenceModel
+from corpus_store import CorpusStore
+
+MODEL = StubSentenceModel(dim=32)
+DOCUMENTS = {
+    "cats": ["Cats sleep most of the day.", "A cat purrs when it is content.", "Kittens chase string."],
+    "rivers": ["Rivers carry water to the sea.", "A delta forms where a river meets the sea."],
+    "stars": ["Stars burn hydrogen into helium.", "A supernova ends a massive star."],
+}
+
+
+def _add(store, key, topics=()):
+    passages = DOCUMENTS[key]
+    return store.add_document(key, key.title(), passages, MODEL.encode(passages),
+                              passage_topics=[0] * len(passages), topics=topics)
+
+
+@pytest.fixture(params=["hnsw", "exact"])
+def store(request, tmp_path, monkeypatch):
+    if request.param == "exact":
+        monkeypatch.setattr(corpus_store, "hnswlib", None)
+    elif corpus_store.hnswlib is None:
+        pytest.skip("hnswlib is not installed")
+    store = CorpusStore(str(tmp_path), "stub")
+    yield store
+    store.close()
+
+
+def test_search_finds_the_matching_passage(store):
+    for key in DOCUMENTS:
+        _add(store, key)
+    hits = store.search_text("Rivers carry water to the sea.", MODEL, k=3)
+    assert hits[0]["text"] == "Rivers carry water to the sea."
+    assert hits[0]["title"] == "Rivers"
+    assert hits[0]["score"] == pytest.approx(1.0, abs=1e-5)
+    assert [h["score"] for h in hits] == sorted((h["score"] for h in hits), reverse=True)
+
+
+def test_documents_are_stored_once(store):
+    first = _add(store, "cats")
+    assert _add(store, "cats") == first
+    assert store.contains("cats") and not store.contains("stars")
+    assert store.stats()["documents"] == 1 and store.stats()["passages"] == 3
+
+
+def test_similar_passages_skip_the_own_document(store):
+    for key in DOCUMENTS:
+        _add(store, key)
+    hits = store.similar_passages(row=0, k=10)
+    assert hits and all(h["title"] != "Cats" for h in hits)
+
+
+def test_embedding_size_must_match(store):
+    _add(store, "cats")
+    with pytest.raises(ValueError):
+        store.add_document("other", "Other", ["Text."], np.ones((1, 8), dtype=np.float32))
+
+
+def test_topics_are_listed_biggest_first(store):
+    _add(store, "cats", topics=[(0, "cat_sleep_purr", "A cat purrs when it is content.")])
+    _add(store, "rivers", topics=[(0, "river_sea_delta", "Rivers carry water to the sea.")])
+    topics = store.topics()
+    assert [t["label"] for t in topics] == ["cat_sleep_purr", "river_sea_delta"]
+    assert topics[0]["row"] == 1  # Row of the representative passage
+    assert [t["title"] for t in store.topics("river")] == ["Rivers"]
+
+
+@pytest.mark.skipif(corpus_store.hnswlib is None, reason="hnswlib is not installed")
+def test_index_behind_the_vectors_is_caught_up(tmp_path):
+    store = CorpusStore(str(tmp_path), "stub")
+    _add(store, "cats")
+    store.close()
+
+    # Rows added after the last save (e.g. before a crash) are not in the index file
+    store = CorpusStore(str(tmp_path), "stub", save_every=1000)
+    _add(store, "rivers")
+    atexit.unregister(store.close)  # Exit without saving, like a crash
+
+    reopened = CorpusStore(str(tmp_path), "stub")
+    assert reopened._index.get_current_count() == 5
+    assert reopened.search_text("A delta forms where a river meets the sea.", MODEL, k=1)[0]["title"] == "Rivers"
+    reopened.close()
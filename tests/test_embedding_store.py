@@ -0,0 +1,59 @@
+import threading
+
+import numpy as np
+
+from benchmarks.stubs import StubSentenceModel
+from embedding_store import EmbeddingStore
+
+
+class _CountingModel(StubSentenceModel):
+    def __init__(self):
+        super().__init__(dim=16)
+        self.encoded = []
+
+    def encode(self, sentences, **kwargs):
+        self.encoded.extend(sentences)
+        return super().encode(sentences, **kwargs)
+
+
+def test_only_new_sentences_are_encoded(tmp_path):
+    store, model = EmbeddingStore(str(tmp_path)), _CountingModel()
+    first = store.encode(["a cat", "a dog", "a cat"], model, "stub")
+    assert model.encoded == ["a cat", "a dog"]  # The repeat is encoded once
+    second = store.encode(["a dog", "a bird"], model, "stub")
+    assert model.encoded == ["a cat", "a dog", "a bird"]
+    np.testing.assert_array_equal(first[1], second[0])
+    np.testing.assert_array_equal(first[0], first[2])
+    assert store.stats() == {"hits": 1, "misses": 3}
+
+
+def test_vectors_match_the_model_and_survive_restarts(tmp_path):
+    model = _CountingModel()
+    sentences = ["one sentence", "another sentence"]
+    EmbeddingStore(str(tmp_path)).encode(sentences, model, "stub")
+    stored = EmbeddingStore(str(tmp_path)).encode(sentences, model, "stub")
+    np.testing.assert_allclose(stored, StubSentenceModel(dim=16).encode(sentences))
+    assert model.encoded == sentences
+
+
+def test_models_are_kept_apart(tmp_path):
+    store, model = EmbeddingStore(str(tmp_path)), _CountingModel()
+    store.encode(["same text"], model, "model-a")
+    store.encode(["same text"], model, "model-b")
+    assert model.encoded == ["same text", "same text"]
+
+
+def test_concurrent_sessions_store_each_sentence_once(tmp_path):
+    store, model = EmbeddingStore(str(tmp_path)), _CountingModel()
+    sentences = [f"sentence {i}" for i in range(50)]
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.encode(sentences, model, "stub")))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all(np.array_equal(r, results[0]) for r in results)
+    state = store._open("stub")
+    assert state["db"].execute("SELECT COUNT(*) FROM sentences").fetchone()[0] == 50
+    assert len(store._vectors(state)) == 50
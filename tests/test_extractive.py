@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from benchmarks.stubs import StubSentenceModel, StubSummarizer
+from extractive import TEXTRANK_MAX_SENTENCES, extractive_summary, score_sentences, select_sentences
+from summarizer import generate_summary
+
+MODEL = StubSentenceModel(dim=64)
+TEXT = ("The river floods the valley every spring. "
+        "Farmers in the valley plant rice after the river floods. "
+        "The valley river brings water and soil to the farmers. "
+        "My cousin collects stamps from old letters. "
+        "Spring floods make the valley soil rich for rice. "
+        "A cat slept on the warm roof all afternoon.")
+
+
+def test_textrank_favours_central_sentences():
+    doc = select_sentences(TEXT, MODEL, ratio=0.5, min_sentences=1)
+    assert len(doc) == 3
+    assert "stamps" not in doc.text and "cat" not in doc.text
+
+
+def test_selected_sentences_keep_document_order():
+    sentences = select_sentences(TEXT, MODEL, ratio=0.5, min_sentences=1).sentences
+    order = [TEXT.index(s) for s in sentences]
+    assert order == sorted(order)
+
+
+@pytest.mark.parametrize("method", ["textrank", "centrality"])
+def test_methods_rank_the_outlier_last(method):
+    embeddings = MODEL.encode(["river valley floods", "valley river soil", "floods river rice", "stamps letters"])
+    assert np.argmin(score_sentences(embeddings, method)) == 3
+
+
+def test_long_documents_fall_back_to_centrality():
+    embeddings = MODEL.encode([f"sentence {i} about things" for i in range(TEXTRANK_MAX_SENTENCES + 1)])
+    np.testing.assert_allclose(score_sentences(embeddings, "textrank"), score_sentences(embeddings, "centrality"))
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        score_sentences(MODEL.encode(["a b"]), "lexrank")
+
+
+def test_short_documents_are_kept_whole():
+    text = "One short sentence. Another one."
+    assert select_sentences(text, MODEL, ratio=0.1).text == text
+    assert extractive_summary(text, MODEL) == text
+
+
+def test_extractive_ratio_needs_a_sentence_model():
+    with pytest.raises(ValueError):
+        generate_summary(TEXT, StubSummarizer(), extractive_ratio=0.5)
+    summary = generate_summary(TEXT, StubSummarizer(), extractive_ratio=0.5, sentence_model=MODEL)
+    assert "stamps" not in summary
@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.stubs import StubSummarizer
+from inference_service import InferenceService, ServiceOverloaded
+
+
+class _RecordingSummarizer(StubSummarizer):
+    """Records every generate call; `gate` (if set) holds the worker inside the call."""
+
+    def __init__(self, gate=None):
+        super().__init__()
+        self.calls = []
+        self.gate = gate
+
+    def __call__(self, inputs, max_length=150, min_length=0, **kwargs):
+        if self.gate is not None:
+            self.gate.wait()
+        self.calls.append((len(inputs) if isinstance(inputs, list) else 1, max_length))
+        return super().__call__(inputs, max_length=max_length, min_length=min_length, **kwargs)
+
+
+def _words(n, word="word"):
+    return " ".join([word] * n)
+
+
+@pytest.fixture
+def service():
+    services = []
+
+    def make(summarizer, **kwargs):
+        services.append(InferenceService(summarizer, **kwargs))
+        return services[-1]
+    yield make
+    for s in services:
+        s.close()
+
+
+def test_callers_share_batches_grouped_by_length_limits(service):
+    summarizer = _RecordingSummarizer()
+    svc = service(summarizer, max_wait=0.2)
+    results = {}
+
+    def caller(name, chunks):
+        results[name] = svc.summarize_chunks(chunks)
+
+    threads = [threading.Thread(target=caller, args=("long", [_words(900, "long")] * 3)),
+               threading.Thread(target=caller, args=("short", [_words(20, "short")] * 2))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Both callers land in one batch, but the short chunks get their own generate call
+    assert sorted(summarizer.calls) == [(2, 16), (3, 150)]
+    assert [len(s.split()) for s in results["long"]] == [150] * 3
+    assert [len(s.split()) for s in results["short"]] == [16] * 2
+    assert svc.metrics()["requests"] == 5
+
+
+def test_requests_past_their_deadline_are_dropped(service):
+    gate = threading.Event()
+    summarizer = _RecordingSummarizer(gate)
+    svc = service(summarizer, max_wait=0.0)
+    first = svc.submit(_words(50))
+    time.sleep(0.05)  # The worker is now blocked in the first call
+    late = svc.submit(_words(50), timeout=0.01)
+    time.sleep(0.05)
+    gate.set()
+
+    assert len(first.result(timeout=5).split()) == 40
+    with pytest.raises(TimeoutError):
+        late.result(timeout=5)
+    assert summarizer.calls == [(1, 40)]
+    assert svc.metrics()["timeouts"] == 1
+
+
+def test_full_queue_applies_backpressure(service):
+    gate = threading.Event()
+    svc = service(_RecordingSummarizer(gate), max_wait=0.0, max_queue=1)
+    running = svc.submit(_words(50))
+    time.sleep(0.05)
+    queued = svc.submit(_words(50))
+    with pytest.raises(ServiceOverloaded):
+        svc.submit(_words(50), timeout=0.05)
+    assert svc.metrics()["rejected"] == 1
+
+    # summarize_chunks turns the rejection into a marker instead of raising
+    assert svc.summarize_chunks([_words(50)], timeout=0.05)[0].startswith("[Summarization failed:")
+    gate.set()
+    assert running.result(timeout=5) and queued.result(timeout=5)
+
+
+def test_close_finishes_queued_chunks():
+    gate = threading.Event()
+    svc = InferenceService(_RecordingSummarizer(gate), max_wait=0.0)
+    futures = [svc.submit(_words(50)) for _ in range(3)]
+    closer = threading.Thread(target=svc.close)
+    closer.start()
+    gate.set()
+    closer.join(timeout=5)
+    assert not closer.is_alive()
+    assert all(len(f.result(timeout=0).split()) == 40 for f in futures)
+
+
+def test_failed_batch_sets_an_error_marker(service):
+    class Failing(StubSummarizer):
+        def __call__(self, inputs, **kwargs):
+            raise RuntimeError("out of memory")
+
+    svc = service(Failing())
+    assert svc.summarize_chunks([_words(50)]) == ["[Summarization failed: out of memory]"]
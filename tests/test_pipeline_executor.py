@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+from benchmarks.stubs import StubSummarizer
+from pipeline_executor import PipelineExecutor
+from summarizer import iter_summary
+
+
+@pytest.fixture
+def executor():
+    executor = PipelineExecutor({"summary": 1, "topics": 1})
+    yield executor
+    executor.shutdown()
+
+
+def _stream(gate, values):
+    for value in values:
+        yield value
+        gate.wait()
+
+
+def test_generator_stages_stream_partial_results(executor):
+    gate = threading.Event()
+    job = executor.start({"summary": (_stream, (gate, ["first", "second"]), {}),
+                          "topics": (lambda: "topics", (), {})})
+    while job.snapshot()["summary"][0] is None:
+        job.wait(1)
+    assert job.snapshot()["summary"] == ("first", False, None)
+    assert not job.done
+
+    gate.set()
+    while not job.wait(1):
+        pass
+    assert job.snapshot() == {"summary": ("second", True, None), "topics": ("topics", True, None)}
+
+
+def test_failed_stage_records_its_error(executor):
+    def fail():
+        raise RuntimeError("model missing")
+
+    job = executor.start({"summary": (fail, (), {}), "topics": (lambda: "topics", (), {})})
+    while not job.wait(1):
+        pass
+    result, finished, error = job.snapshot()["summary"]
+    assert result is None and finished and isinstance(error, RuntimeError)
+    assert job.snapshot()["topics"] == ("topics", True, None)
+
+
+def test_done_callbacks_run_once_when_every_stage_finished(executor):
+    gate = threading.Event()
+    calls = []
+    job = executor.start({"summary": (_stream, (gate, ["only"]), {}), "topics": (lambda: "topics", (), {})})
+    job.add_done_callback(calls.append)
+    assert calls == []
+    gate.set()
+    while not job.wait(1):
+        pass
+    executor.shutdown()  # The callbacks run on the worker thread, after wait() can return
+    assert calls == [job]
+
+    job.add_done_callback(calls.append)  # Already done: runs straight away
+    assert calls == [job, job]
+    assert job.seconds >= 0
+
+
+def test_iter_summary_streams_chunk_summaries(executor):
+    text = " ".join(f"Sentence {i} " + " ".join(["word"] * 7) + "." for i in range(200))
+    job = executor.start({"summary": (iter_summary, (text, StubSummarizer(model_max_length=256)),
+                                      {"batch_size": 1})})
+    while not job.wait(1):
+        pass
+    final = job.snapshot()["summary"][0]
+    assert final["done"] and final["progress"] == 1.0
+    assert final["chunks_done"] == final["chunks"] > 1
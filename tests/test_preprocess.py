@@ -0,0 +1,88 @@
+import pytest
+
+from dedup import near_duplicates, strip_repeated_lines
+from preprocess import normalize, preprocess
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("He said no. We left.", ["He said no.", "We left."]),
+    ("Dr. Smith arrived. He sat down.", ["Dr. Smith arrived.", "He sat down."]),
+    ("Use a tool, e.g. a hammer. Then stop.", ["Use a tool, e.g. a hammer.", "Then stop."]),
+    ("The U.S. policy changed. It did.", ["The U.S. policy changed.", "It did."]),
+    ("J. Smith wrote it. Others read it.", ["J. Smith wrote it.", "Others read it."]),
+    ("It took approx. five hours. Then rain.", ["It took approx. five hours.", "Then rain."]),
+    ("See item No. 5 for details. Thanks.", ["See item No. 5 for details.", "Thanks."]),
+    ("Apples, pears etc. Then came Bob.", ["Apples, pears etc.", "Then came Bob."]),
+    ("Visit example.com. Then leave.", ["Visit example.com.", "Then leave."]),
+    ("Boil it for 5 min. The pasta is done.", ["Boil it for 5 min.", "The pasta is done."]),
+    ("It lasted until Dec. The rest followed.", ["It lasted until Dec.", "The rest followed."]),
+    ("Boil for 5 min. and stir.", ["Boil for 5 min. and stir."]),
+])
+def test_abbreviations(text, expected):
+    assert preprocess(text).sentences == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("It costs 3.5 dollars. Fine.", ["It costs 3.5 dollars.", "Fine."]),
+    ("Version 2.0.1 is out. Update now.", ["Version 2.0.1 is out.", "Update now."]),
+    ("Growth was 0.75%. It slowed.", ["Growth was 0.75%.", "It slowed."]),
+])
+def test_decimals(text, expected):
+    assert preprocess(text).sentences == expected
+
+
+def test_questions_exclamations_and_quotes():
+    assert preprocess('Is it? "Yes!" he said. Done.').sentences == ['Is it?', '"Yes!" he said.', 'Done.']
+
+
+def test_normalize_joins_hyphenated_line_breaks():
+    assert normalize("infor-\nmation  is­good\n\nhere") == "information isgood here"
+
+
+def test_document_offsets_and_word_counts():
+    doc = preprocess("One two three. Four five.")
+    assert [doc.text[s:e] for s, e in zip(doc.starts, doc.ends)] == doc.sentences
+    assert list(doc.word_counts) == [3, 2]
+    assert doc.words == 5
+
+
+def test_select_keeps_order_and_offsets():
+    doc = preprocess("A one. B two. C three.").select([0, 2])
+    assert doc.sentences == ["A one.", "C three."]
+    assert doc.text == "A one. C three."
+
+
+def test_repeated_headers_and_page_numbers_are_stripped():
+    names = ["one", "two", "three", "four"]
+    pages = [f"ACME Report\nPage {i} of 4\nPart {names[i - 1]}.\nRevenue was {i}0 million in Q{i}.\n"
+             f"Costs were flat.\nSee the appendix.\nConfidential\n{i}" for i in range(1, 5)]
+    cleaned, dropped = strip_repeated_lines(pages)
+    # Headers, footers and page numbers go; body lines that differ only in their numbers stay
+    assert cleaned[1].split("\n") == ["Part two.", "Revenue was 20 million in Q2."]
+    assert dropped == sum(map(len, pages)) - sum(map(len, cleaned)) - 6 * 4  # 6 newlines per page fewer
+
+
+def test_page_numbers_only_at_page_edges():
+    pages = ["Title\nThe total was\n42\nin the end.\nMore text", "Another page\nwith text\n2"]
+    cleaned, _ = strip_repeated_lines(pages)
+    assert cleaned == ["Title\nThe total was\n42\nin the end.\nMore text", "Another page\nwith text"]
+
+
+def test_single_page_text_keeps_number_lines():
+    assert preprocess("Year\n2023\nRevenue grew a lot.", dedup=True).sentences == ["Year 2023 Revenue grew a lot."]
+
+
+def test_near_duplicates():
+    sentences = [
+        "The quick brown fox jumps over the lazy dog near the river bank.",
+        "Something else entirely about mountains and snow.",
+        "The quick brown fox jumps over the lazy dog near the river bank today!",
+        "the quick brown fox jumps over the lazy dog near the river bank",
+    ]
+    assert near_duplicates(sentences) == [2, 3]
+
+
+def test_dedup_records_dropped_characters():
+    doc = preprocess("A long repeated sentence is here. Another one. A long repeated sentence is here.", dedup=True)
+    assert doc.sentences == ["A long repeated sentence is here.", "Another one."]
+    assert doc.dropped["duplicates"] == len("A long repeated sentence is here.")
@@ -0,0 +1,68 @@
+import json
+import zlib
+
+from benchmarks.stubs import StubSummarizer
+from result_cache import ResultCache, make_key
+from summarizer import generate_summary
+
+
+class _CountingSummarizer(StubSummarizer):
+    def __init__(self):
+        super().__init__(model_max_length=256)
+        self.chunks = 0
+
+    def __call__(self, inputs, **kwargs):
+        self.chunks += len(inputs) if isinstance(inputs, list) else 1
+        return super().__call__(inputs, **kwargs)
+
+
+def _text(sentences=200):
+    return " ".join(f"Sentence {i} " + " ".join(["word"] * 7) + "." for i in range(sentences))
+
+
+def test_keys_depend_on_every_part():
+    assert make_key("summary", "model", "text", 150) == make_key("summary", "model", "text", 150)
+    assert make_key("summary", "model", "text", 150) != make_key("summary", "model", "text", 120)
+
+
+def test_memory_tier_evicts_least_recently_used():
+    entry = len(zlib.compress(json.dumps("value 0").encode("utf-8")))
+    cache = ResultCache(max_memory_bytes=2 * entry)
+    cache.put("k0", "value 0")
+    cache.put("k1", "value 1")
+    cache.get("k0")  # Now the most recently used
+    cache.put("k2", "value 2")
+    assert cache.get("k1") is None
+    assert (cache.get("k0"), cache.get("k2")) == ("value 0", "value 2")
+    assert cache.stats()["memory_entries"] == 2
+
+
+def test_disk_tier_survives_restarts(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    ResultCache(disk_path=path).put("key", {"summary": "kept"})
+    cache = ResultCache(disk_path=path)
+    assert cache.get("key") == {"summary": "kept"}
+    assert cache.get("other") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["disk_hits"], stats["misses"], stats["disk_entries"]) == (1, 1, 1, 1)
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(disk_path=str(tmp_path / "results.sqlite"), max_disk_bytes=300)
+    for i in range(20):
+        cache.put(f"k{i}", f"value {i} " * 10)
+    assert cache.stats()["disk_bytes"] <= 300
+    assert ResultCache(disk_path=str(tmp_path / "results.sqlite")).get("k19") is not None
+
+
+def test_edited_document_only_resummarizes_chunks_near_the_edit():
+    cache = ResultCache()
+    summarizer = _CountingSummarizer()
+    text = _text()
+    first = generate_summary(text, summarizer, cache=cache)
+    chunks = summarizer.chunks
+    assert generate_summary(text, summarizer, cache=cache) == first
+    assert summarizer.chunks == chunks  # Whole-document hit
+
+    generate_summary(text.replace("Sentence 3 ", "Sentence 3 edited "), summarizer, cache=cache)
+    assert 0 < summarizer.chunks - chunks <= 2
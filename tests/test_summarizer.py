@@ -0,0 +1,93 @@
+import pytest
+
+from benchmarks.stubs import StubSummarizer, StubTokenizer
+from summarizer import _SPECIAL_TOKEN_MARGIN, _model_name, chunk_text, length_limits, summarize_chunks
+
+
+def _text(sentences=40, words=9):
+    return " ".join(f"Sentence {i} " + " ".join(["word"] * (words - 2)) + "." for i in range(sentences))
+
+
+def test_chunks_stay_within_the_token_budget():
+    tokenizer = StubTokenizer()
+    chunks = chunk_text(_text(), max_chunk=64, tokenizer=tokenizer)
+    assert len(chunks) > 1
+    assert all(len(chunk.split()) <= 64 - _SPECIAL_TOKEN_MARGIN for chunk in chunks)
+
+
+def test_chunks_respect_the_model_limit():
+    tokenizer = StubTokenizer(model_max_length=40)
+    chunks = chunk_text(_text(), max_chunk=1024, tokenizer=tokenizer)
+    assert all(len(chunk.split()) <= 40 - _SPECIAL_TOKEN_MARGIN for chunk in chunks)
+
+
+def test_chunks_keep_whole_sentences_and_lose_nothing():
+    text = _text()
+    chunks = chunk_text(text, max_chunk=64, tokenizer=StubTokenizer())
+    assert " ".join(chunks) == text
+    assert all(chunk.endswith(".") for chunk in chunks)
+
+
+def test_long_sentence_is_sliced():
+    text = " ".join(["word"] * 100) + "."
+    chunks = chunk_text(text, max_chunk=36, tokenizer=StubTokenizer())
+    assert [len(chunk.split()) for chunk in chunks] == [20] * 5
+    assert " ".join(chunks) == text
+
+
+@pytest.mark.parametrize("overlap", [9, 18, 25])
+def test_overlap_repeats_trailing_sentences(overlap):
+    sentences = _text().split(". ")
+    chunks = chunk_text(_text(), max_chunk=64, tokenizer=StubTokenizer(), overlap=overlap)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        carried = [s for s in chunk.split(". ") if s in previous]
+        # Only whole trailing sentences are carried, and never more than `overlap` tokens
+        assert 0 < sum(len(s.split()) for s in carried) <= overlap
+        assert previous.rstrip(".").endswith(carried[-1].rstrip("."))
+    assert len(chunks) > len(chunk_text(_text(), max_chunk=64, tokenizer=StubTokenizer()))
+    assert all(len(chunk.split()) <= 64 - _SPECIAL_TOKEN_MARGIN for chunk in chunks)
+    assert sentences[-1].rstrip(".") in chunks[-1]
+
+
+def test_without_tokenizer_chunks_are_character_slices():
+    assert chunk_text("abcdefghij", max_chunk=4) == ["abcd", "efgh", "ij"]
+
+
+class _RecordingSummarizer(StubSummarizer):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def __call__(self, inputs, max_length=150, min_length=0, **kwargs):
+        self.calls.append((len(inputs) if isinstance(inputs, list) else 1, max_length))
+        return super().__call__(inputs, max_length=max_length, min_length=min_length, **kwargs)
+
+
+def test_short_chunk_does_not_cap_long_chunks():
+    summarizer = _RecordingSummarizer()
+    chunks = [" ".join(["long"] * 900)] * 4 + [" ".join(["short"] * 20)]
+    summaries = summarize_chunks(chunks, summarizer, default_max_length=150, batch_size=8)
+    assert [len(s.split()) for s in summaries] == [150] * 4 + [16]
+    assert sorted(summarizer.calls) == [(1, 16), (4, 150)]
+
+
+def test_length_limits():
+    assert length_limits(1000, 150) == (150, 30)
+    assert length_limits(20, 150) == (16, 8)
+
+
+def test_cache_name_includes_the_backend():
+    fp32, int8 = StubSummarizer(name="org/model"), StubSummarizer(name="org/model")
+    fp32.cache_tag, int8.cache_tag = "org/model:pytorch", "org/model:int8"
+    assert _model_name(fp32) != _model_name(int8)
+    assert _model_name(StubSummarizer(name="org/model")) == "org/model"
+
+
+def test_chunk_boundaries_survive_an_edit():
+    text = _text(sentences=200)
+    edited = "An inserted opening sentence with a few extra words. " + text.replace("Sentence 3 ", "Sentence 3 edited ")
+    before = chunk_text(text, max_chunk=256, tokenizer=StubTokenizer())
+    after = chunk_text(edited, max_chunk=256, tokenizer=StubTokenizer())
+    # Only the chunks around the edits differ; the rest keep their cached summaries
+    assert len(set(after) - set(before)) <= 2
+    assert len(set(before) & set(after)) >= len(before) - 2
@@ -0,0 +1,13 @@
+from benchmarks.stubs import StubTopicModel
+from topic_modeler import _topic_model_signature
+
+
+def test_signature_is_stable_across_instances():
+    assert _topic_model_signature(StubTopicModel()) == _topic_model_signature(StubTopicModel())
+    assert _topic_model_signature(StubTopicModel()) != _topic_model_signature(StubTopicModel(n_topics=3))
+
+
+def test_reference_models_are_keyed_on_their_fit():
+    first, refit = StubTopicModel(), StubTopicModel()
+    first.reference_id, refit.reference_id = "/models/topics:aaa", "/models/topics:bbb"
+    assert _topic_model_signature(first) != _topic_model_signature(refit)
@@ -1,19 +1,42 @@
-# Import necessary modules from BERTopic and supporting libraries
-from bertopic import BERTopic
-from sentence_transformers import SentenceTransformer
-from umap import UMAP
-from hdbscan import HDBSCAN
-from sklearn.feature_extraction.text import CountVectorizer, ENGLISH_STOP_WORDS
-import streamlit as st
+# Heavy libraries (BERTopic, UMAP, HDBSCAN, SentenceTransformers, scikit-learn) are
+# imported inside the functions that use them, so importing this module is instant
+import logging
+import re
+import threading
+from contextlib import ExitStack, contextmanager
 from typing import Dict, List
 
-# Cache the model so it doesn't reload every time the app runs
-@st.cache_resource
-def initialize_topic_model():
+from model_registry import get_model
+from preprocess import preprocess
+from result_cache import make_key
+from tracing import instrument, span
+
+logger = logging.getLogger(__name__)
+
+# Below this many sentences UMAP + HDBSCAN cost more than they give (and often mark
+# everything as outliers), so the embeddings are clustered directly with k-means
+SMALL_DOC_SENTENCES = 50
+
+# Largest number of topics tried for a small document
+SMALL_DOC_MAX_TOPICS = 8
+
+
+def initialize_topic_model(embedding_model_name: str = "all-MiniLM-L6-v2"):
+    """Return the process-wide BERTopic model for this embedding model, loading it on first use."""
+    return get_model(f"topic_model:{embedding_model_name}",
+                     lambda: _build_topic_model(embedding_model_name))
+
+
+def _build_topic_model(embedding_model_name: str):
     """Initialize BERTopic with stopword removal and clustering settings."""
+    from bertopic import BERTopic
+    from hdbscan import HDBSCAN
+    from sentence_transformers import SentenceTransformer
+    from sklearn.feature_extraction.text import CountVectorizer
+    from umap import UMAP
 
     # Load a lightweight sentence transformer model for embeddings
-    embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+    embedding_model = SentenceTransformer(embedding_model_name)
 
     # Configure UMAP for dimensionality reduction
     umap_model = UMAP(
@@ -46,11 +69,264 @@ def initialize_topic_model():
     return topic_model  # Return the initialized topic model
 
 
-def extract_topics(text: str, topic_model) -> Dict:
-    """Extract clean topics and representative sentences from input text."""
+def get_sentence_model(topic_model):
+    """Return the SentenceTransformer inside a BERTopic model."""
+    backend = topic_model.embedding_model
+    # BERTopic wraps the SentenceTransformer in its own backend class
+    return getattr(backend, "embedding_model", backend)
+
+
+def sentence_model_name(sentence_model) -> str:
+    """Name of the checkpoint a SentenceTransformer was loaded from."""
+    name = getattr(getattr(sentence_model, "model_card_data", None), "base_model", None)
+    if not name:
+        try:
+            name = sentence_model[0].auto_model.name_or_path
+        except Exception:
+            name = type(sentence_model).__name__
+    return name
+
+
+def _pick_topic_count(embeddings) -> int:
+    """Choose k for k-means by the best silhouette score (1 if no split helps)."""
+    from sklearn.cluster import KMeans
+    from sklearn.metrics import silhouette_score
+
+    best_k, best_score = 1, 0.0
+    for k in range(2, min(SMALL_DOC_MAX_TOPICS, len(embeddings) - 1) + 1):
+        labels = KMeans(n_clusters=k, n_init=10, random_state=42).fit_predict(embeddings)
+        score = silhouette_score(embeddings, labels)
+        if score > best_score:
+            best_k, best_score = k, score
+    return best_k
+
+
+def _small_topic_model(topic_model, n_topics: int):
+    """A BERTopic that skips UMAP and clusters normalized embeddings with k-means."""
+    from bertopic import BERTopic
+    from bertopic.dimensionality import BaseDimensionalityReduction
+    from sklearn.cluster import KMeans
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    return BERTopic(
+        embedding_model=get_sentence_model(topic_model),
+        umap_model=BaseDimensionalityReduction(),  # Use the embeddings as they are
+        hdbscan_model=KMeans(n_clusters=n_topics, n_init=10, random_state=42),
+        vectorizer_model=CountVectorizer(stop_words="english"),
+        calculate_probabilities=False,
+        verbose=False
+    )
+
+
+def _topic_model_signature(topic_model) -> str:
+    """Describe the topic model's configuration (or, for a reference model, its fit) for use in cache keys."""
+    # A reference model's topics depend on what it was fitted on, not just its configuration
+    reference_id = getattr(topic_model, "reference_id", None)
+    if reference_id:
+        return reference_id
+    try:
+        params = topic_model.get_params()
+    except Exception:
+        return type(topic_model).__name__
+
+    # The embedding model repr does not name the checkpoint, so add it explicitly;
+    # object addresses in reprs differ between processes, so drop them
+    name = sentence_model_name(get_sentence_model(topic_model))
+    return repr((name, sorted((k, re.sub(r" at 0x[0-9a-fA-F]+", "", repr(v))) for k, v in params.items())))
+
+
+@contextmanager
+def _instrumented(topic_model):
+    """Time the embedding, UMAP, HDBSCAN and c-TF-IDF steps inside BERTopic while tracing."""
+    with ExitStack() as stack:
+        stack.enter_context(instrument(getattr(topic_model, "embedding_model", None), "embed", ["embed_documents"]))
+        stack.enter_context(instrument(getattr(topic_model, "umap_model", None), "umap", ["fit", "transform"]))
+        stack.enter_context(instrument(getattr(topic_model, "hdbscan_model", None), "hdbscan", ["fit"]))
+        stack.enter_context(instrument(getattr(topic_model, "vectorizer_model", None), "c_tf_idf", ["fit", "transform"]))
+        stack.enter_context(instrument(getattr(topic_model, "ctfidf_model", None), "c_tf_idf", ["fit", "transform"]))
+        yield
+
+
+def _fresh_topic_model(topic_model):
+    """Unfitted per-request copy of a BERTopic that shares the (read-only) embedding model.
+
+    Fitting the shared model in place would let concurrent requests overwrite each
+    other's topics.
+    """
+    from bertopic import BERTopic
+    from sklearn.base import clone
+
+    params = topic_model.get_params()
+    for name in ("umap_model", "hdbscan_model", "vectorizer_model", "ctfidf_model"):
+        if params.get(name) is not None:
+            params[name] = clone(params[name])
+    params["embedding_model"] = get_sentence_model(topic_model)
+    return BERTopic(**params)
+
+
+def split_topic_sentences(text) -> List[str]:
+    """Return the sentences (> 5 words) of a text or preprocessed Document that topic modeling works on."""
+    doc = preprocess(text)
+    return [sent for sent, words in zip(doc.sentences, doc.word_counts) if words > 5]
+
+
+def _build_online_topic_model(embedding_model_name: str, n_clusters: int = 20):
+    """BERTopic that can learn incrementally with partial_fit.
+
+    The first partial_fit batch needs at least `n_clusters` sentences.
+    """
+    from bertopic import BERTopic
+    from bertopic.vectorizers import OnlineCountVectorizer
+    from sentence_transformers import SentenceTransformer
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.decomposition import IncrementalPCA
+
+    return BERTopic(
+        embedding_model=SentenceTransformer(embedding_model_name),
+        umap_model=IncrementalPCA(n_components=5),                             # Incremental dimensionality reduction
+        hdbscan_model=MiniBatchKMeans(n_clusters=n_clusters, random_state=42),  # Mini-batch clustering
+        vectorizer_model=OnlineCountVectorizer(stop_words="english", decay=.01),  # Vocabulary that keeps learning
+        verbose=False
+    )
+
+
+def fit_reference_model(docs: List[str], path: str, embedding_model_name: str = "all-MiniLM-L6-v2",
+                        online: bool = False, batch_size: int = 1000):
+    """Fit a topic model once on a reference corpus of sentences and save it to `path`.
+
+    Read-only models are saved with safetensors and serve requests with `transform`
+    only. Online models are pickled so `partial_fit` can keep updating them.
+    """
+    import json
+    import os
+    import uuid
+
+    if online and len(docs) < _MIN_PARTIAL_FIT_DOCS:
+        raise ValueError(f"An online reference model needs at least {_MIN_PARTIAL_FIT_DOCS} sentences, "
+                         f"got {len(docs)}")
+    os.makedirs(path, exist_ok=True)
+    if online:
+        batch_size = max(batch_size, _MIN_PARTIAL_FIT_DOCS)
+        starts = list(range(0, len(docs), batch_size))
+        if len(starts) > 1 and len(docs) - starts[-1] < _MIN_PARTIAL_FIT_DOCS:
+            starts.pop()  # Fold a too-short last batch into the one before it
+        batches = [docs[start:end] for start, end in zip(starts, starts[1:] + [len(docs)])]
+        # k-means needs at least as many sentences as clusters in its first batch
+        topic_model = _build_online_topic_model(embedding_model_name, n_clusters=min(20, len(batches[0])))
+        for batch in batches:
+            topic_model.partial_fit(batch)
+        topic_model.save(os.path.join(path, "model.pickle"), serialization="pickle")
+    else:
+        topic_model = _build_topic_model(embedding_model_name)
+        topic_model.fit(docs)
+        topic_model.save(path, serialization="safetensors", save_ctfidf=True,
+                         save_embedding_model=embedding_model_name)
+
+    with open(os.path.join(path, "reference.json"), "w", encoding="utf-8") as f:
+        json.dump({"mode": "online" if online else "transform",
+                   "embedding_model": embedding_model_name,
+                   "documents": len(docs),
+                   "fit_id": uuid.uuid4().hex}, f)  # Tells cached results of different fits apart
+    return topic_model
+
+
+def load_reference_model(path: str):
+    """Load a model saved by fit_reference_model once per process.
+
+    Returns `(topic_model, mode)`, where mode is "transform" or "online".
+    """
+    import atexit
+    import json
+    import os
+
+    with open(os.path.join(path, "reference.json"), encoding="utf-8") as f:
+        info = json.load(f)
+
+    def load():
+        from bertopic import BERTopic
+        if info["mode"] == "online":
+            topic_model = BERTopic.load(os.path.join(path, "model.pickle"))
+            topic_model.reference_path = path  # Where partial_fit updates are saved
+            topic_model.reference_updates = 0
+            atexit.register(save_online_model, topic_model)  # Keep the updates since the last save
+        else:
+            topic_model = BERTopic.load(path, embedding_model=info["embedding_model"])
+        # Models saved before fit ids existed fall back to the time they were written
+        fit_id = info.get("fit_id") or str(os.path.getmtime(os.path.join(path, "reference.json")))
+        topic_model.reference_id = f"{os.path.abspath(path)}:{fit_id}"
+        return topic_model
+
+    return get_model(f"reference_topic_model:{os.path.abspath(path)}", load), info["mode"]
+
+
+# Serializes partial_fit on shared online models
+_online_lock = threading.Lock()
+
+# partial_fit needs at least as many sentences as IncrementalPCA has components
+_MIN_PARTIAL_FIT_DOCS = 5
+
+# Save an online reference model after this many partial_fit updates
+ONLINE_SAVE_EVERY = 50
+
+
+def _save_online_model(topic_model):
+    """Write an online reference model back to its folder (call while holding _online_lock).
+
+    Written to a temporary file and renamed, so a crash mid-save keeps the previous model.
+    """
+    import os
+
+    target = os.path.join(topic_model.reference_path, "model.pickle")
+    tmp = f"{target}.tmp-{os.getpid()}"
+    topic_model.save(tmp, serialization="pickle")
+    os.replace(tmp, target)
+    topic_model.reference_updates = 0
+
+
+def save_online_model(topic_model):
+    """Save the partial_fit updates of an online reference model not yet written (runs at exit)."""
+    with _online_lock:
+        if getattr(topic_model, "reference_updates", 0):
+            _save_online_model(topic_model)
+
+
+def extract_topics(text, topic_model, cache=None, embedding_store=None,
+                   small_doc_threshold: int = SMALL_DOC_SENTENCES, mode: str = "fit",
+                   corpus=None, title: str = None) -> Dict:
+    """Extract clean topics and representative sentences from input text (or a preprocessed Document).
+
+    mode: "fit" fits a fresh model on this text; "transform" assigns sentences to
+    the topics of a model from fit_reference_model; "online" also folds the
+    sentences into an online reference model with partial_fit.
+    corpus: optional CorpusStore that keeps the sentences, their embeddings and
+    topics under `title` for later search.
+    """
+    if mode not in ("fit", "transform", "online"):
+        raise ValueError(f"Unknown topic extraction mode: {mode}")
+    doc = preprocess(text)
+    with span("extract_topics", chars=len(doc.text), mode=mode):
+        return _extract_topics(doc, topic_model, cache, embedding_store, small_doc_threshold, mode,
+                               corpus, title)
+
+
+def _extract_topics(doc, topic_model, cache, embedding_store, small_doc_threshold, mode,
+                    corpus=None, title=None) -> Dict:
 
-    # Preprocess: split input text into sentences with > 5 words
-    docs = [sent.strip() for sent in text.split('.') if len(sent.strip().split()) > 5]
+    # Reuse the result if this text was processed with the same model before
+    # (online models change with every request, so their results are not cached)
+    key = None
+    if cache is not None and mode != "online":
+        key = make_key("topics", _topic_model_signature(topic_model), doc.text,
+                       small_doc_threshold, mode)
+        cached = cache.get(key)
+        # (a document not yet in the corpus is processed again to get its embeddings)
+        if cached is not None and (corpus is None or corpus.contains(make_key("corpus", doc.text))):
+            return cached
+
+    # Keep the sentences with > 5 words from the preprocessed document
+    with span("split_sentences") as split:
+        docs = split_topic_sentences(doc)
+        split.set(sentences=len(docs))
 
     # If not enough valid text segments, return a fallback message
     if not docs or len(docs) < 3:
@@ -62,29 +338,88 @@ def extract_topics(text: str, topic_model) -> Dict:
         }
 
     try:
+        from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+        # Reuse stored sentence embeddings and only encode sentences not seen before
+        embeddings = None
+        if embedding_store is not None:
+            with span("embed", sentences=len(docs), store=True):
+                sentence_model = get_sentence_model(topic_model)
+                embeddings = embedding_store.encode(docs, sentence_model, sentence_model_name(sentence_model))
+        elif corpus is not None:
+            # The corpus keeps the embeddings, so compute them up front
+            with span("embed", sentences=len(docs)):
+                embeddings = get_sentence_model(topic_model).encode(docs, show_progress_bar=False)
+
+        if mode != "fit":
+            # Reference model: a single embedding pass, no refit
+            if embeddings is None:
+                with span("embed", sentences=len(docs)):
+                    embeddings = get_sentence_model(topic_model).encode(docs, show_progress_bar=False)
+            with span("transform", sentences=len(docs)):
+                if mode == "online":
+                    with _online_lock:
+                        if len(docs) >= _MIN_PARTIAL_FIT_DOCS:
+                            topic_model.partial_fit(docs, embeddings=embeddings)
+                            if getattr(topic_model, "reference_path", None):
+                                topic_model.reference_updates += 1
+                                if topic_model.reference_updates >= ONLINE_SAVE_EVERY:
+                                    _save_online_model(topic_model)
+                        topics, probs = topic_model.transform(docs, embeddings=embeddings)
+                else:
+                    topics, probs = topic_model.transform(docs, embeddings=embeddings)
+            result = _topics_from_assignments(topic_model, docs, topics, probs, ENGLISH_STOP_WORDS)
+            if key is not None:
+                cache.put(key, result)
+            if corpus is not None:
+                _add_to_corpus(corpus, doc, title, topic_model, docs, embeddings, topics, result)
+            return result
+
+        # Short documents: cluster the normalized embeddings directly instead of UMAP + HDBSCAN
+        # (only for BERTopic-style models that have a UMAP step to skip)
+        if len(docs) < small_doc_threshold and hasattr(topic_model, "umap_model"):
+            with span("small_doc_clustering", sentences=len(docs)) as small:
+                import numpy as np
+
+                if embeddings is None:
+                    embeddings = get_sentence_model(topic_model).encode(docs, show_progress_bar=False)
+                embeddings = np.asarray(embeddings, dtype=np.float32)
+                embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+                n_topics = _pick_topic_count(embeddings)
+                model = _small_topic_model(topic_model, n_topics)
+                small.set(topics=n_topics)
+        elif hasattr(topic_model, "get_params") and hasattr(topic_model, "umap_model"):
+            # Fit a per-request copy so concurrent sessions never share fitted state
+            model = _fresh_topic_model(topic_model)
+        else:
+            model = topic_model
+
         # Fit BERTopic model and extract topic assignments
-        topics, _ = topic_model.fit_transform(docs)
+        with span("fit_transform", sentences=len(docs)), _instrumented(model):
+            topics, _ = model.fit_transform(docs, embeddings=embeddings)
 
         # Get the topic summary table
-        topic_info = topic_model.get_topic_info()
+        topic_info = model.get_topic_info()
 
         # Filter out the outlier topic (-1)
         valid_topics = topic_info[topic_info.Topic != -1]
 
         topic_labels = []        # Store topic names (labels)
         topic_descriptions = []  # Store a sample sentence for each topic
+        topic_ids = []           # Store the model's id of each labelled topic
 
         for topic_id in valid_topics['Topic']:
             # Get top words from each topic
-            topic_words = topic_model.get_topic(topic_id)
+            topic_words = model.get_topic(topic_id)
             if topic_words:
                 # Filter out stopwords and pick top 5
                 clean_words = [w[0] for w in topic_words if w[0].lower() not in ENGLISH_STOP_WORDS]
                 topic_labels.append(", ".join(clean_words[:5]))
+                topic_ids.append(int(topic_id))
 
             try:
                 # Try getting a representative document (text segment) for the topic
-                rep_docs = topic_model.get_representative_docs(topic_id)
+                rep_docs = model.get_representative_docs(topic_id)
                 if rep_docs:
                     topic_descriptions.append(rep_docs[0])
                 else:
@@ -95,24 +430,79 @@ def extract_topics(text: str, topic_model) -> Dict:
         # Generate an overall topic summary sentence
         summary = _generate_topic_summary(topic_labels)
 
-        return {
+        result = {
             "name": "Extracted Topics",
             "summary": summary,
             "topics": topic_labels,
-            "descriptions": topic_descriptions
+            "descriptions": topic_descriptions,
+            "topic_ids": topic_ids
         }
+        if key is not None:
+            cache.put(key, result)
+        if corpus is not None:
+            _add_to_corpus(corpus, doc, title, topic_model, docs, embeddings, topics, result)
+        return result
 
     except Exception as e:
-        # If anything goes wrong, show an error and return fallback
-        st.error(f"Topic extraction failed: {e}")
+        # If anything goes wrong, log the error and return fallback
+        logger.exception("Topic extraction failed")
         return {
             "name": "Extracted Topics",
             "summary": "Topic extraction failed.",
             "topics": [],
-            "descriptions": []
+            "descriptions": [],
+            "error": str(e)
         }
 
 
+def _topics_from_assignments(topic_model, docs, topics, probs, stop_words) -> Dict:
+    """Build the result from a reference model's topic assignments for this document.
+
+    Topics are ordered by how many sentences they got; each is described by its
+    most confidently assigned sentence from this document.
+    """
+    import numpy as np
+
+    topics = np.asarray(topics)
+    if probs is None:
+        scores = np.ones(len(docs))
+    else:
+        probs = np.asarray(probs)
+        scores = probs.max(axis=1) if probs.ndim == 2 else probs
+
+    topic_ids, counts = np.unique(topics[topics != -1], return_counts=True)
+    topic_ids = [int(topic_id) for topic_id in topic_ids[np.argsort(-counts, kind="stable")]]
+    topic_labels = []
+    topic_descriptions = []
+    for topic_id in topic_ids:
+        topic_words = topic_model.get_topic(topic_id) or []
+        clean_words = [w[0] for w in topic_words if w[0].lower() not in stop_words]
+        topic_labels.append(", ".join(clean_words[:5]))
+
+        members = np.flatnonzero(topics == topic_id)
+        topic_descriptions.append(docs[members[np.argmax(scores[members])]])
+
+    return {
+        "name": "Extracted Topics",
+        "summary": _generate_topic_summary(topic_labels),
+        "topics": topic_labels,
+        "descriptions": topic_descriptions,
+        "topic_ids": topic_ids
+    }
+
+
+def _add_to_corpus(corpus, doc, title, topic_model, docs, embeddings, topics, result) -> None:
+    """Keep this document's sentences, embeddings and topics in the corpus store."""
+    try:
+        with span("corpus_add", sentences=len(docs)):
+            corpus.add_document(make_key("corpus", doc.text), title or docs[0][:60], docs, embeddings,
+                                [int(t) for t in topics],
+                                list(zip(result["topic_ids"], result["topics"], result["descriptions"])))
+    except Exception:
+        # The topics are still returned; the document is just not searchable
+        logger.exception("Adding the document to the corpus failed")
+
+
 # Generate a natural-language summary sentence of the topics
 def _generate_topic_summary(topic_labels: List[str]) -> str:
     if not topic_labels:
@@ -0,0 +1,417 @@
+# Lightweight per-stage tracing: nested timing spans with counts and memory
+#
+#   with trace() as t:
+#       summary = generate_summary(text, summarizer)
+#   t.to_chrome_trace()   # open in chrome://tracing or https://ui.perfetto.dev
+#
+# Core functions open spans with `span(...)`; they cost almost nothing when no
+# trace is active.
+import cProfile
+import copy
+import io
+import itertools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_current_trace = ContextVar("current_trace", default=None)
+_current_span = ContextVar("current_span", default=None)
+_profile_sink = ContextVar("profile_sink", default=None)
+_span_ids = itertools.count(1)
+
+
+def rss_mb():
+    """Current resident memory of this process in MB (0 if unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+
+def process_peak_rss_mb():
+    """Highest resident memory this process has reached in its whole life, in MB (0 if unavailable)."""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class _RssSampler:
+    """Samples RSS every `interval` seconds while any span is open, raising each open span's peak.
+
+    RSS is process-wide, so a span's peak also includes memory used by work
+    running at the same time in other threads.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._open = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._thread = None
+
+    def add(self, s):
+        with self._lock:
+            self._open.add(s)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+                self._thread.start()
+            self._wake.notify()
+
+    def remove(self, s):
+        with self._lock:
+            self._open.discard(s)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._open:
+                    self._wake.wait()  # Idle (no thread wake-ups) until a span opens
+                spans = list(self._open)
+            rss = rss_mb()
+            for s in spans:
+                if rss > s.peak_rss_mb:
+                    s.peak_rss_mb = rss
+            time.sleep(self.interval)
+
+
+_rss_sampler = _RssSampler()
+
+
+class Span:
+    """One timed region of work, with counts (chunks, tokens, ...) attached as attrs."""
+
+    def __init__(self, name, parent_id, attrs):
+        self.id = next(_span_ids)
+        self.name = name
+        self.parent_id = parent_id
+        self.attrs = dict(attrs)
+        self.thread = threading.current_thread().name
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter()
+        self.end = None
+        self.rss_start_mb = rss_mb()
+        self.rss_end_mb = None
+        self.peak_rss_mb = self.rss_start_mb  # Highest RSS sampled while the span was open
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    @property
+    def seconds(self):
+        return (self.end or time.perf_counter()) - self.start
+
+
+class _NullSpan:
+    """Stand-in returned by span() when nothing is being traced."""
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    """All spans recorded while a trace() block was active, from any thread."""
+
+    def __init__(self):
+        self.spans = []
+        self.start = time.perf_counter()
+        self.profile = None  # Text report from an attached profiler, if any
+        self._lock = threading.Lock()
+
+    def _add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def merge(self, other):
+        """Add another trace's spans (e.g. PDF extraction done before processing) to this one."""
+        with self._lock:
+            self.spans.extend(other.spans)
+            self.start = min(self.start, other.start)
+
+    def rows(self):
+        """Spans as an indented tree (children under their parent, in start order), for display."""
+        children = {}
+        for s in sorted(self.spans, key=lambda s: s.start):
+            children.setdefault(s.parent_id, []).append(s)
+
+        ordered = []
+        def visit(parent_id, depth):
+            for s in children.get(parent_id, []):
+                ordered.append((s, depth))
+                visit(s.id, depth + 1)
+        visit(None, 0)
+
+        rows = []
+        for s, depth in ordered:
+            rows.append({
+                "span": "  " * depth + s.name,
+                "seconds": round(s.seconds, 4),
+                "start": round(s.start - self.start, 4),
+                "thread": s.thread,
+                "rss_mb": round(s.rss_end_mb or 0, 1),
+                "rss_delta_mb": round((s.rss_end_mb or 0) - s.rss_start_mb, 1),
+                "peak_rss_mb": round(s.peak_rss_mb or 0, 1),
+                **s.attrs,
+            })
+        return rows
+
+    def to_dict(self):
+        return {
+            "spans": [{
+                "id": s.id,
+                "parent_id": s.parent_id,
+                "name": s.name,
+                "thread": s.thread,
+                "start_seconds": s.start - self.start,
+                "seconds": s.seconds,
+                "rss_start_mb": s.rss_start_mb,
+                "rss_end_mb": s.rss_end_mb,
+                "peak_rss_mb": s.peak_rss_mb,
+                "attrs": s.attrs,
+            } for s in sorted(self.spans, key=lambda s: s.start)],
+            "profile": self.profile,
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2, default=str)
+
+    def to_chrome_trace(self):
+        """Chrome trace-event JSON (complete "X" events, microseconds)."""
+        events = [{
+            "name": s.name,
+            "ph": "X",
+            "ts": (s.start - self.start) * 1e6,
+            "dur": s.seconds * 1e6,
+            "pid": os.getpid(),
+            "tid": s.thread_id,
+            "args": {**s.attrs, "rss_end_mb": s.rss_end_mb, "peak_rss_mb": s.peak_rss_mb},
+        } for s in self.spans]
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, default=str)
+
+
+@contextmanager
+def trace():
+    """Record every span opened inside the block (including in threads that copy the context)."""
+    t = Trace()
+    trace_token = _current_trace.set(t)
+    span_token = _current_span.set(None)
+    try:
+        yield t
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time a region of work as a child of the current span."""
+    t = _current_trace.get()
+    if t is None:
+        yield _NULL_SPAN
+        return
+
+    parent = _current_span.get()
+    s = Span(name, parent.id if parent else None, attrs)
+    token = _current_span.set(s)
+    _rss_sampler.add(s)
+    try:
+        yield s
+    finally:
+        s.end = time.perf_counter()
+        _rss_sampler.remove(s)
+        s.rss_end_mb = rss_mb()
+        s.peak_rss_mb = max(s.peak_rss_mb, s.rss_end_mb)
+        _current_span.reset(token)
+        t._add(s)
+
+
+def current_position():
+    """The active trace and span, to hand to graft() from another thread (None if not tracing)."""
+    t = _current_trace.get()
+    return None if t is None else (t, _current_span.get())
+
+
+def graft(other, position):
+    """Copy another trace's spans into a trace, under the span saved by current_position().
+
+    Used when work for several callers runs together on a shared worker thread:
+    the worker records the spans once and each caller's trace gets a copy.
+    """
+    t, parent = position
+    for s in other.spans:
+        s = copy.copy(s)
+        s.attrs = dict(s.attrs)
+        if s.parent_id is None:
+            s.parent_id = parent.id if parent else None
+        t._add(s)
+
+
+def is_tracing():
+    return _current_trace.get() is not None
+
+
+def traced(fn, *args, **kwargs):
+    """Call `fn` under a new trace and return `(result, trace)`."""
+    with trace() as t:
+        result = fn(*args, **kwargs)
+    return result, t
+
+
+@contextmanager
+def instrument(obj, name, methods):
+    """Temporarily wrap `obj`'s methods so each call records a span called `name`.
+
+    Used to time steps inside third-party code (e.g. UMAP inside BERTopic). The
+    wrappers are removed on exit so the object can still be pickled.
+    """
+    if obj is None or not is_tracing():
+        yield
+        return
+
+    patched = []
+    for method in methods:
+        original = getattr(obj, method, None)
+        if original is None:
+            continue
+
+        def wrapper(*args, _original=original, _method=method, **kwargs):
+            with span(name, method=_method):
+                return _original(*args, **kwargs)
+
+        setattr(obj, method, wrapper)
+        patched.append(method)
+    try:
+        yield
+    finally:
+        for method in patched:
+            try:
+                delattr(obj, method)
+            except AttributeError:
+                pass
+
+
+class SamplingProfiler:
+    """py-spy-style wall-clock sampler: records every thread's Python stack every `interval` seconds.
+
+    The result is in collapsed-stack format, which flamegraph.pl and speedscope read.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                self.samples[";".join([names.get(thread_id, str(thread_id))] + stack[::-1])] += 1
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+
+def current_profile_sink():
+    """The active profile() block's sink, for work handed to a thread that does not share its context."""
+    return _profile_sink.get()
+
+
+def run_profiled(fn, *args, sinks=None, **kwargs):
+    """Call `fn`, adding a cProfile of the call to the active profile() block if there is one.
+
+    Thread pools call their tasks through this so worker threads are profiled too.
+    sinks: profile() sinks to add to instead, e.g. those of every caller in a shared batch.
+    """
+    if sinks is None:
+        sinks = [s for s in [_profile_sink.get()] if s is not None]
+    # From Python 3.12 cProfile is process-wide and already sees every thread
+    if not sinks or sys.version_info >= (3, 12):
+        return fn(*args, **kwargs)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        for sink in sinks:
+            sink.append(profiler)
+
+
+@contextmanager
+def profile(mode="cprofile", limit=40, t=None):
+    """Profile the block and store a text report on the trace (`t.profile`).
+
+    mode: "cprofile" for deterministic function stats (the calling thread plus any
+    work started through run_profiled), or "sampling" for a low-overhead sampler
+    covering all threads. From Python 3.12 only one cProfile can run per process, so
+    while another block is profiling, "cprofile" falls back to sampling.
+    """
+    t = t or _current_trace.get()
+    profiler = None
+    if mode != "sampling":
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # Another profiling tool is already active
+            profiler = None
+    if profiler is None:
+        sampler = SamplingProfiler()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            if t is not None:
+                t.profile = sampler.collapsed()
+        return
+
+    sink = []
+    token = _profile_sink.set(sink)
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _profile_sink.reset(token)
+        if t is not None:
+            out = io.StringIO()
+            stats = pstats.Stats(profiler, stream=out)
+            for worker_profiler in sink:
+                stats.add(worker_profiler)
+            stats.sort_stats("cumulative").print_stats(limit)
+            t.profile = out.getvalue()